@@ -1,23 +1,73 @@
+import time
+_IMPORT_START = time.perf_counter()
 import streamlit as st
 import pandas as pd
 import numpy as np
-import altair as alt
+_IMPORT_END = time.perf_counter()
 from datetime import datetime, timedelta
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from google.oauth2 import service_account
+import importlib
 import os
+import sys
+from collections import deque
 
-# Set page config for better appearance
-st.set_page_config(
-    page_title="Restaurant Tracker",
-    page_icon="🍽️",
-    layout="wide",
-    initial_sidebar_state="expanded"
+from ledger import (
+    COLUMNS,
+    PARTICIPANTS,
+    PARTICIPANTS_ENV,
+    SHARES_PATTERN,
+    TIME_RESOLUTIONS,
+    calculate_balance,
+    choose_time_resolution,
+    compute_data_version,
+    count_column,
+    format_shares,
+    create_summary_table,
+    detect_changes,
+    expense_row,
+    filter_transactions,
+    ledger_participants,
+    prepare_chart_data,
+    rebucket_monthly,
+    settlement,
+    shares_error,
+    unknown_payers,
 )
+from ledger import budgets, canonical, dedupe, fx, history, importers, journal, metrics, recurring, sheets, splits, suggest
+from memprofile import PROFILER
+from tracing import append_jsonl, finish_trace, span, start_trace
+
+# ===== Startup Helpers =====
+
+# Set RESTAURANT_TRACKER_STARTUP_REPORT=1 to show the import-time breakdown
+STARTUP_REPORT_ENV = 'RESTAURANT_TRACKER_STARTUP_REPORT'
+
+@st.cache_resource
+def get_startup_timings():
+    """Process-wide record of import and first-run durations in seconds"""
+    return {}
+
+def lazy_import(module_name):
+    """Import a module on first use and record how long the first import took"""
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    get_startup_timings().setdefault(f'import {module_name}', time.perf_counter() - start)
+    return module
+
+class LazyModule:
+    """Stand-in for a module that is only imported when an attribute is used"""
+    def __init__(self, module_name):
+        self._module_name = module_name
+
+    def __getattr__(self, attr):
+        return getattr(lazy_import(self._module_name), attr)
+
+# Heavy dependencies that are not needed to paint the first screen
+alt = LazyModule('altair')
 
 # Custom CSS for better styling and improved readability
-st.markdown("""
+APP_CSS = """
 <style>
     .main-header {
         font-size: 2.5rem;
@@ -91,87 +141,72 @@ st.markdown("""
         border-color: #ccc !important;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
 
-# Set up Google Sheets credentials - using the same code as before
-SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
-SPREADSHEET_ID = '1QrUs7dCZefWxPbhNcn_h99VN2DE3AQaBlZz0G9haxXE'
-RANGE_NAME = 'Sheet1!A:D'
+def configure_page():
+    """Set page config and inject the app stylesheet"""
+    st.set_page_config(
+        page_title="Restaurant Tracker",
+        page_icon="🍽️",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
+    # Streamlit drops elements that are not re-emitted on a rerun, so the
+    # stylesheet is sent every run; the string itself is built only once.
+    st.markdown(APP_CSS, unsafe_allow_html=True)
+
+def render_startup_report(script_start):
+    """Record first-run timings and optionally show them in the sidebar"""
+    timings = get_startup_timings()
+    timings.setdefault('import streamlit, pandas, numpy', _IMPORT_END - _IMPORT_START)
+    first_run = 'first run (script start to last element)' not in timings
+    timings.setdefault('first run (script start to last element)', time.perf_counter() - script_start)
+    
+    if not os.environ.get(STARTUP_REPORT_ENV):
+        return
+    
+    report = pd.DataFrame(
+        [(stage, seconds * 1000) for stage, seconds in timings.items()],
+        columns=['Stage', 'Milliseconds']
+    )
+    if first_run:
+        print(report.to_string(index=False), file=sys.stderr)
+    with st.sidebar.expander("⏱️ Startup timing"):
+        st.dataframe(
+            report,
+            column_config={'Milliseconds': st.column_config.NumberColumn(format="%.1f")},
+            hide_index=True,
+            use_container_width=True
+        )
+
+# Set SHEETS_API_ENDPOINT (e.g. http://127.0.0.1:8765/) to use a local Sheets
+# stand-in such as benchmarks/sheets_emulator.py instead of Google
+SHEETS_ENDPOINT_ENV = 'SHEETS_API_ENDPOINT'
+
+# ===== Google Sheets functions =====
+# Storage lives in ledger.sheets; these wrappers add Streamlit secrets and error reporting
 
-# ===== Google Sheets functions remain the same =====
 def setup_google_sheets():
-    # Create credentials dictionary from secrets
-    credentials = {
-        "type": st.secrets["gcp_service_account"]["type"],
-        "project_id": st.secrets["gcp_service_account"]["project_id"],
-        "private_key_id": st.secrets["gcp_service_account"]["private_key_id"],
-        "private_key": st.secrets["gcp_service_account"]["private_key"],
-        "client_email": st.secrets["gcp_service_account"]["client_email"],
-        "client_id": st.secrets["gcp_service_account"]["client_id"],
-        "auth_uri": st.secrets["gcp_service_account"]["auth_uri"],
-        "token_uri": st.secrets["gcp_service_account"]["token_uri"],
-        "auth_provider_x509_cert_url": st.secrets["gcp_service_account"]["auth_provider_x509_cert_url"],
-        "client_x509_cert_url": st.secrets["gcp_service_account"]["client_x509_cert_url"]
-    }
+    # The Google client libraries are only imported once we actually connect
+    lazy_import('googleapiclient.discovery')
     
-    creds = service_account.Credentials.from_service_account_info(
-        credentials, scopes=SCOPES)
-    service = build('sheets', 'v4', credentials=creds)
-    return service
+    endpoint = os.environ.get(SHEETS_ENDPOINT_ENV)
+    if endpoint:
+        return sheets.connect_local(endpoint)
+    
+    lazy_import('google.oauth2.service_account')
+    return sheets.connect(dict(st.secrets["gcp_service_account"]))
 
 def update_sheet(service, values):
-    body = {
-        'values': [values]
-    }
-    result = service.spreadsheets().values().append(
-        spreadsheetId=SPREADSHEET_ID,
-        range=RANGE_NAME,
-        valueInputOption='USER_ENTERED',
-        body=body
-    ).execute()
-    return result
+    return sheets.update_sheet(service, values)
 
 def fetch_sheet_data(service):
-    result = service.spreadsheets().values().get(
-        spreadsheetId=SPREADSHEET_ID,
-        range=RANGE_NAME
-    ).execute()
-    values = result.get('values', [])
-    return values
-
-def get_sheet_id(service):
-    """Get the sheet ID of the first sheet in the spreadsheet."""
-    try:
-        spreadsheet = service.spreadsheets().get(spreadsheetId=SPREADSHEET_ID).execute()
-        return spreadsheet['sheets'][0]['properties']['sheetId']
-    except Exception as e:
-        st.error(f"Error getting sheet ID: {str(e)}")
-        return None
+    return sheets.fetch_sheet_data(service)
 
 def delete_row(service, row_index):
     """Delete a row from the Google Sheet."""
-    sheet_id = get_sheet_id(service)
-    if sheet_id is None:
-        return False
-
     try:
-        request = {
-            "deleteDimension": {
-                "range": {
-                    "sheetId": sheet_id,
-                    "dimension": "ROWS",
-                    "startIndex": row_index - 1,  # Convert to 0-based index
-                    "endIndex": row_index
-                }
-            }
-        }
-        
-        body = {"requests": [request]}
-        
-        service.spreadsheets().batchUpdate(
-            spreadsheetId=SPREADSHEET_ID,
-            body=body
-        ).execute()
+        sheets.delete_row(service, row_index)
         return True
     except Exception as e:
         st.error(f"Error deleting row: {str(e)}")
@@ -180,188 +215,855 @@ def delete_row(service, row_index):
 def update_cell(service, row_index, col_index, value):
     """Update a specific cell in the Google Sheet."""
     try:
-        # Get the A1 notation range for the cell
-        col_letter = chr(65 + col_index)  # A=0, B=1, etc.
-        cell_range = f'Sheet1!{col_letter}{row_index}'
-        
-        # Update the value
-        body = {
-            'values': [[value]]
-        }
-        
-        result = service.spreadsheets().values().update(
-            spreadsheetId=SPREADSHEET_ID,
-            range=cell_range,
-            valueInputOption='USER_ENTERED',
-            body=body
-        ).execute()
-        
-        # Verify the update
-        verify = service.spreadsheets().values().get(
-            spreadsheetId=SPREADSHEET_ID,
-            range=cell_range
-        ).execute()
-        
-        if 'values' in verify and verify['values'][0][0] == value:
-            return True
-        else:
-            st.error("Cell update verification failed")
-            return False
-            
+        sheets.update_cell(service, row_index, col_index, value)
+        return True
     except Exception as e:
         st.error(f"Error updating cell: {str(e)}")
         return False
 
-# ===== Enhanced Data Processing Functions =====
+# ===== History =====
+
+JOURNAL_FILE_ENV = 'RESTAURANT_TRACKER_JOURNAL'
+HISTORY_DIR_ENV = 'RESTAURANT_TRACKER_HISTORY'
+
+@st.cache_resource
+def get_history():
+    """Change log and snapshots for point-in-time views, shared by every session"""
+    return history.History(os.environ.get(HISTORY_DIR_ENV, history.HISTORY_DIR))
 
-def create_summary_table(data):
-    if not data or len(data) < 2:
-        return pd.DataFrame(), pd.DataFrame()
+@st.cache_resource
+def get_journal():
+    """Undo/redo journal of sheet writes, shared by every session in the process"""
+    operations = journal.Journal.load(os.environ.get(JOURNAL_FILE_ENV, journal.JOURNAL_FILE))
+    # Every write, undo and redo also goes to the change log
+    operations.listeners.append(get_history().record_entry)
+    return operations
+
+def render_undo_controls(service):
+    """Undo and redo buttons for the latest writes to the sheet"""
+    operations = get_journal()
+    undo_entry, redo_entry = operations.next_undo, operations.next_redo
+    if not undo_entry and not redo_entry:
+        return
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        undo = st.button(
+            f"↩️ Undo: {undo_entry['label']}" if undo_entry else "↩️ Undo",
+            disabled=not undo_entry,
+            key="journal_undo",
+            use_container_width=True,
+            help=f"Made {undo_entry['time'].replace('T', ' ')}" if undo_entry else None
+        )
+    with col2:
+        redo = st.button(
+            f"↪️ Redo: {redo_entry['label']}" if redo_entry else "↪️ Redo",
+            disabled=not redo_entry,
+            key="journal_redo",
+            use_container_width=True
+        )
+    
+    if undo or redo:
+        try:
+            entry = operations.undo(service) if undo else operations.redo(service)
+            if entry:
+                st.session_state.delete_success = True
+                st.session_state.delete_message = f"✅ {'Undid' if undo else 'Redid'}: {entry['label']}"
+            st.rerun()
+        except (sheets.SheetsError, OSError) as e:
+            st.error(str(e))
+        except Exception as e:
+            st.error(f"Error applying the change: {str(e)}")
+
+def render_time_travel():
+    """Balance and summary table as the ledger stood at an earlier time"""
+    log = get_history()
+    if log.start is None:
+        st.info("The change history starts with the next visit")
+        return
+    
+    events = list(reversed(log.recent))
+    choice = st.selectbox(
+        "Show the ledger",
+        range(-1, len(events)),
+        format_func=lambda i: "As of a date and time" if i < 0 else f"Before: {events[i]['label']} ({events[i]['time'][:16].replace('T', ' ')})",
+        key="time_travel_choice"
+    )
+    if choice < 0:
+        col1, col2 = st.columns(2)
+        with col1:
+            day = st.date_input("Date", datetime.now(), key="time_travel_date")
+        with col2:
+            at = st.time_input("Time", datetime.max.time().replace(microsecond=0), key="time_travel_time")
+        when = datetime.combine(day, at)
+    else:
+        when = datetime.fromisoformat(events[choice]['time']) - timedelta(microseconds=1)
     
-    # Create DataFrame from sheet data
-    df = pd.DataFrame(data[1:], columns=['Date', 'Name', 'Restaurant', 'Amount'])
+    rows = log.rows_at(when)
+    if rows is None:
+        # Before the log began, rebuild from the earliest state and the expense dates
+        rows = log.rows_at(log.start)
+        rows = rows[:1] + [row for row in rows[1:] if row[0][:10] <= when.strftime('%Y-%m-%d')]
+        st.caption(f"The change history starts {log.start:%Y-%m-%d %H:%M}; earlier views only count expenses dated by then")
+    if len(rows) < 2:
+        st.info("No expenses had been recorded by then")
+        return
     
-    # Convert Amount to float
-    df['Amount'] = pd.to_numeric(df['Amount'], errors='coerce')
+    rates = get_fx_rates()
+    version = compute_data_version(rows)
+    participants = ledger_participants(rows)
+    summary_table, chart_df = build_summary(version, rates.version, tuple(participants), rows)
+    owed = compute_owed_totals(f'{version}-{rates.version}', get_split_rules().version, tuple(participants), chart_df)
+    balance_text, balance_amount, _ = calculate_balance(summary_table, owed)
     
-    # Convert Date to datetime
-    df['Date'] = pd.to_datetime(df['Date'])
+    st.metric(f"{balance_text} on {when:%Y-%m-%d %H:%M}", f"${balance_amount:.2f}")
+    summary_view, summary_config = build_summary_presentation(f'{version}-{rates.version}', summary_table)
+    st.dataframe(summary_view, column_config=summary_config, use_container_width=True, height=300)
+
+# ===== Duplicate Detection =====
+
+IDEMPOTENCY_KEYS_ENV = 'RESTAURANT_TRACKER_IDEMPOTENCY_KEYS'
+
+@st.cache_resource
+def get_expense_index():
+    """Hash index of recorded expenses, shared by every session in the process"""
+    return dedupe.ExpenseIndex(keys_path=os.environ.get(IDEMPOTENCY_KEYS_ENV, dedupe.IDEMPOTENCY_KEYS_FILE))
+
+def submission_key(form, rows):
+    """Idempotency key for a form's pending write, kept until the write succeeds or its rows change"""
+    state_key = f'{form}_idempotency_key'
+    fingerprint = compute_data_version(rows)
+    if st.session_state.get(state_key, (None, None))[0] != fingerprint:
+        st.session_state[state_key] = (fingerprint, dedupe.new_idempotency_key())
+    return st.session_state[state_key][1]
+
+def consume_submission_key(form):
+    """Start a new submission after a successful write"""
+    st.session_state.pop(f'{form}_idempotency_key', None)
+
+@st.cache_resource
+def get_restaurant_index():
+    """Ranked restaurant suggestions, shared by every session in the process"""
+    return suggest.RestaurantIndex()
+
+def append_expenses(service, rows, form, expense_index, progress=None):
+    """Append a form's rows once and keep the shared indexes and budget totals current"""
+    appended = dedupe.append_once(service, rows, submission_key(form, rows), expense_index, progress=progress)
+    if appended:
+        consume_submission_key(form)
+        get_journal().record(journal.appended(rows, f"Add {len(rows)} expense(s)"))
+        get_restaurant_index().add(rows)
+        tracker = get_budget_tracker()
+        for row in rows:
+            amount = reporting_amount(row)
+            # Unconverted amounts stay out of the totals, as in the summary table
+            if not np.isnan(amount):
+                tracker.record(row[0][:7], row[1], amount)
+    return appended
+
+def choose_restaurant(name):
+    """Suggestion button callback: select the restaurant in the Add Expense form"""
+    st.session_state.last_restaurant = name
+    st.session_state.pop('tab1_restaurant', None)
+
+# ===== Restaurant Aliases =====
+
+ALIASES_FILE_ENV = 'RESTAURANT_TRACKER_ALIASES'
+ALIAS_SIMILARITY = 0.5
+
+@st.cache_resource
+def get_alias_table():
+    """Restaurant alias table, loaded once per process and shared by every session"""
+    return canonical.AliasTable.load(os.environ.get(ALIASES_FILE_ENV, canonical.ALIASES_FILE))
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def find_similar_restaurants(data_version, alias_version, _names):
+    """Pairs of canonical names that look like the same restaurant"""
+    return canonical.TrigramIndex(_names).candidate_pairs(ALIAS_SIMILARITY)
+
+def render_alias_admin(data_version, names):
+    """Review likely duplicates and merge restaurant names into one canonical name"""
+    aliases = get_alias_table()
+    pairs = find_similar_restaurants(data_version, aliases.version, names)
+    if pairs:
+        st.write("Names that look alike:")
+        st.dataframe(
+            pd.DataFrame(pairs, columns=['Name', 'Similar to', 'Similarity']),
+            hide_index=True,
+            use_container_width=True,
+            column_config={'Similarity': st.column_config.ProgressColumn("Similarity", min_value=0.0, max_value=1.0)}
+        )
+    
+    sources = st.multiselect("Names to merge", sorted(names), key="alias_sources")
+    target = st.selectbox("Merge into", sorted(names), key="alias_target")
+    custom_target = st.text_input("Or a new canonical name", key="alias_custom_target").strip()
+    target = custom_target or target
     
-    # Create Month-Year column
-    df['Month-Year'] = df['Date'].dt.strftime('%Y-%m')
+    if st.button("🔗 Merge names", disabled=not sources or not target, key="alias_merge"):
+        try:
+            aliases.merge(sources, target)
+            aliases.save()
+            # Chart specs are cached per data version, which a merge does not change
+            get_chart_spec.clear()
+            st.success(f"✅ Merged {len(sources)} name(s) into {target}")
+            st.rerun()
+        except OSError as e:
+            st.error(f"Could not save the alias table: {str(e)}")
     
-    # Create pivot table for amounts
-    amount_pivot = pd.pivot_table(
-        df,
-        values='Amount',
-        index='Month-Year',
-        columns='Name',
-        aggfunc='sum',
-        fill_value=0
+    if len(aliases):
+        st.caption(f"{len(aliases)} alias(es) saved in {aliases.path}")
+
+# ===== Currencies =====
+
+FX_RATES_FILE_ENV = 'RESTAURANT_TRACKER_FX_RATES'
+
+@st.cache_resource
+def get_fx_rates():
+    """Exchange-rate table, loaded once per process and shared by every session"""
+    return fx.FxRates.load(os.environ.get(FX_RATES_FILE_ENV, fx.RATES_FILE))
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def build_summary(data_version, rates_version, participants, _sheet_data):
+    """Summary table and chart frame in the reporting currency, once per data version and rate table"""
+    return create_summary_table(_sheet_data, list(participants), get_fx_rates())
+
+def reporting_amount(row):
+    """A sheet row's amount in the reporting currency; NaN when its currency has no rate"""
+    currency = row[5] if len(row) > 5 else ''
+    rate = get_fx_rates().rates_for(currency, np.array([np.datetime64(row[0], 'ns')]))[0]
+    return float(row[3]) * rate
+
+def missing_rate_message(currency):
+    rates = get_fx_rates()
+    return f"No exchange rate for {currency}; add it to {rates.path or fx.RATES_FILE} or enter the amount in {rates.reporting}"
+
+# ===== Budgets =====
+
+BUDGETS_FILE_ENV = 'RESTAURANT_TRACKER_BUDGETS'
+
+@st.cache_resource
+def get_budgets():
+    """Monthly budget limits, loaded once per process and shared by every session"""
+    return budgets.Budgets.load(os.environ.get(BUDGETS_FILE_ENV, budgets.BUDGETS_FILE))
+
+@st.cache_resource
+def get_budget_tracker():
+    """Month-to-date spending, seeded from the summary table and updated on append"""
+    return budgets.BudgetTracker()
+
+def budget_message(status):
+    return f"{status.label}: ${max(status.remaining, 0):,.2f} of ${status.limit:,.2f} left"
+
+def render_budget_alerts(month):
+    """Warn about budgets nearly used up or exceeded this month"""
+    limits = get_budgets()
+    if not limits:
+        return
+    for status in get_budget_tracker().alerts(limits, month):
+        if status.level == 'over':
+            st.warning(f"🚨 {status.label} is ${-status.remaining:,.2f} over the {month} budget of ${status.limit:,.2f}")
+        else:
+            st.info(f"🎯 {budget_message(status)} for {month}")
+
+def render_budget_editor(participants):
+    """Edit the household and per-person monthly limits"""
+    limits = get_budgets()
+    household = st.number_input(
+        "Household budget per month", min_value=0.0, step=10.0,
+        value=float(limits.household or 0.0), key="budget_household"
+    )
+    people = st.data_editor(
+        pd.DataFrame({'Person': participants, 'Budget': [float(limits.people.get(name) or 0.0) for name in participants]}),
+        hide_index=True,
+        use_container_width=True,
+        disabled=['Person'],
+        column_config={'Budget': st.column_config.NumberColumn("Budget per month", min_value=0.0, step=10.0, format="$%.2f")},
+        key="budget_people"
     )
+    st.caption(f"In {get_fx_rates().reporting}; 0 means no budget")
     
-    # Create pivot table for count of entries
-    count_pivot = pd.pivot_table(
-        df,
-        values='Amount',
-        index='Month-Year',
-        columns='Name',
-        aggfunc='count',
-        fill_value=0
+    if st.button("💾 Save budgets", key="budget_save"):
+        try:
+            limits.household = household or None
+            limits.people = {row['Person']: row['Budget'] for row in people.to_dict('records') if row['Budget']}
+            limits.save()
+            st.success("✅ Budgets saved")
+            st.rerun()
+        except OSError as e:
+            st.error(f"Could not save the budgets: {str(e)}")
+
+# ===== Split Ratios =====
+
+SPLITS_FILE_ENV = 'RESTAURANT_TRACKER_SPLITS'
+
+@st.cache_resource
+def get_split_rules():
+    """Split-ratio schedule and overrides, loaded once per process and shared by every session"""
+    return splits.SplitRules.load(os.environ.get(SPLITS_FILE_ENV, splits.SPLITS_FILE))
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def compute_owed_totals(data_version, rules_version, participants, _chart_df):
+    """What each participant should carry under the split rules and each expense's shares, or None for an equal split"""
+    rules = get_split_rules()
+    if not rules and not splits.has_shares(_chart_df):
+        return None
+    return splits.owed_totals(_chart_df, rules, list(participants))
+
+def render_split_schedule(participants):
+    """Edit the weights each participant carries from a given date on"""
+    rules = get_split_rules()
+    schedule = rules.schedule_frame(participants)
+    edited = st.data_editor(
+        schedule,
+        num_rows="dynamic",
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            'Effective': st.column_config.DateColumn("Effective from", format="YYYY-MM-DD", required=True),
+            **{name: st.column_config.NumberColumn(name, min_value=0.0, step=1.0) for name in participants},
+        },
+        key=f"split_schedule_{rules.version}"
     )
+    st.caption("Weights are relative (60/40 and 3/2 are the same split). Before the first date everyone pays an equal share.")
+    if rules.overrides:
+        st.caption(f"{len(rules.overrides)} expense(s) have their own split")
     
-    # Ensure Katy and Sebastien columns exist in both pivots
-    for pivot in [amount_pivot, count_pivot]:
-        for name in ['Katy', 'Sebastien']:
-            if name not in pivot.columns:
-                pivot[name] = 0
+    if st.button("💾 Save split ratios", key="split_schedule_save"):
+        try:
+            rules.set_schedule(edited)
+            rules.save()
+            st.success("✅ Split ratios saved")
+            st.rerun()
+        except OSError as e:
+            st.error(f"Could not save the split ratios: {str(e)}")
+
+# ===== Recurring Expenses =====
+
+RECURRING_FILE_ENV = 'RESTAURANT_TRACKER_RECURRING'
+RECURRING_FREQUENCIES = {'week': "Every week", 'month': "Every month", 'day': "Every day"}
+
+@st.cache_resource
+def get_recurring_expenses():
+    """Recurring expense definitions, loaded once per process and shared by every session"""
+    return recurring.RecurringExpenses.load(os.environ.get(RECURRING_FILE_ENV, recurring.RECURRING_FILE))
+
+def materialize_recurring(service, expense_index):
+    """Write every recurring expense that came due since the last run; returns the rows added"""
+    definitions = get_recurring_expenses()
+    if not definitions:
+        return []
+    try:
+        rows = recurring.materialize(service, definitions, expense_index, datetime.now().date())
+    except Exception as e:
+        st.warning(f"Could not add recurring expenses: {str(e)}")
+        return []
+    if rows:
+        get_journal().record(journal.appended(rows, f"Add {len(rows)} recurring expense(s)"))
+    return rows
+
+def render_recurring_editor(participants, restaurant_options):
+    """Define and remove recurring expenses"""
+    definitions = get_recurring_expenses()
+    if definitions:
+        listed = pd.DataFrame(definitions.definitions)
+        listed['every'] = [
+            f"{RECURRING_FREQUENCIES[every]}" if interval == 1 else f"Every {interval} {every}s"
+            for every, interval in zip(listed['every'], listed['interval'])
+        ]
+        st.dataframe(
+            listed[['name', 'restaurant', 'amount', 'every', 'start', 'end', 'through']].rename(columns={
+                'name': 'Name', 'restaurant': 'Restaurant', 'amount': 'Amount', 'every': 'Repeats',
+                'start': 'From', 'end': 'Until', 'through': 'Added through',
+            }),
+            hide_index=True,
+            use_container_width=True
+        )
+        labels = {d['id']: f"{d['restaurant']} ({d['name']}, ${float(d['amount']):.2f})" for d in definitions.definitions}
+        removed = st.multiselect("Stop repeating", list(labels), format_func=labels.get, key="recurring_remove")
+        if removed and st.button(f"🗑️ Remove {len(removed)} recurring expense(s)", key="recurring_remove_submit"):
+            try:
+                with definitions.lock:
+                    for definition_id in removed:
+                        definitions.remove(definition_id)
+                    definitions.save()
+                st.rerun()
+            except OSError as e:
+                st.error(f"Could not save the recurring expenses: {str(e)}")
     
-    # Calculate differences and running balance
-    amount_pivot['Monthly Difference'] = amount_pivot['Katy'] - amount_pivot['Sebastien']
-    amount_pivot['Running Balance'] = amount_pivot['Monthly Difference'].cumsum()
-    count_pivot['Count Difference'] = count_pivot['Katy'] - count_pivot['Sebastien']
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        name = st.selectbox("Paid by", participants, key="recurring_name")
+        every = st.selectbox("Repeats", list(RECURRING_FREQUENCIES), format_func=RECURRING_FREQUENCIES.get, key="recurring_every")
+    with col2:
+        restaurant = st.selectbox("Restaurant", [r for r in restaurant_options if r] + [""], key="recurring_restaurant")
+        if not restaurant:
+            restaurant = st.text_input("New restaurant", key="recurring_new_restaurant")
+        interval = st.number_input("Every how many", min_value=1, step=1, value=1, key="recurring_interval")
+    with col3:
+        amount = st.number_input("Amount", min_value=0.0, step=0.01, format="%.2f", key="recurring_amount")
+        start = st.date_input("Starting", datetime.now(), key="recurring_start")
+    st.caption("Past dates are added right away; later ones are added on the first visit on or after their date")
     
-    # Rename count columns
-    count_cols = {
-        'Katy': 'Katy (Count)',
-        'Sebastien': 'Sebastien (Count)',
-    }
-    count_pivot = count_pivot.rename(columns=count_cols)
+    if st.button("🔁 Add recurring expense", key="recurring_add"):
+        try:
+            with definitions.lock:
+                definitions.add(name, restaurant, amount, every, start, interval=interval)
+                definitions.save()
+            st.rerun()
+        except ValueError as e:
+            st.error(f"Please check the recurring expense: {str(e)}")
+        except OSError as e:
+            st.error(f"Could not save the recurring expenses: {str(e)}")
+
+# ===== Batch Entry =====
+
+def render_batch_entry(service, participants, restaurant_options, expense_index):
+    """Editable grid of staged expenses committed together in one append"""
+    # Bumping the version gives the editor a fresh key, which clears the grid
+    if 'batch_entry_version' not in st.session_state:
+        st.session_state.batch_entry_version = 0
     
-    # Combine amount and count pivots
-    final_table = pd.concat([
-        amount_pivot[['Katy', 'Sebastien', 'Monthly Difference', 'Running Balance']],
-        count_pivot[['Katy (Count)', 'Sebastien (Count)', 'Count Difference']]
-    ], axis=1)
+    staged = pd.DataFrame({
+        'Date': pd.Series(dtype='datetime64[ns]'),
+        'Name': pd.Series(dtype='object'),
+        'Restaurant': pd.Series(dtype='object'),
+        'Amount': pd.Series(dtype='float'),
+        'Shares': pd.Series(dtype='object'),
+        'Currency': pd.Series(dtype='object'),
+    })
+    edited = st.data_editor(
+        staged,
+        num_rows="dynamic",
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            'Date': st.column_config.DateColumn("Date", format="YYYY-MM-DD", default=datetime.now().date(), required=True),
+            'Name': st.column_config.SelectboxColumn(
+                "Name", options=participants, default=st.session_state.get('last_name') or None, required=True
+            ),
+            'Restaurant': st.column_config.SelectboxColumn(
+                "Restaurant", options=[r for r in restaurant_options if r], required=True
+            ) if len(restaurant_options) > 1 else st.column_config.TextColumn("Restaurant", required=True),
+            'Amount': st.column_config.NumberColumn("Bill Amount", min_value=0.0, step=0.01, format="$%.2f", required=True),
+            'Shares': st.column_config.TextColumn(
+                "Shared by", help="e.g. Katy,Sebastien or Katy:2,Sebastien:1 (empty: everyone)", validate=SHARES_PATTERN
+            ),
+            'Currency': st.column_config.SelectboxColumn("Currency", options=get_fx_rates().currencies, help=f"Empty: {get_fx_rates().reporting}"),
+        },
+        key=f"batch_entry_{st.session_state.batch_entry_version}"
+    )
     
-    # Sort by Month-Year
-    final_table = final_table.sort_index(ascending=False)
+    reporting = get_fx_rates().reporting
+    rows = []
+    incomplete = 0
+    invalid_shares = []
+    unconverted = set()
+    for record in edited.to_dict('records'):
+        error = shares_error(record['Shares']) if isinstance(record['Shares'], str) else None
+        if error:
+            invalid_shares.append(f"{record['Restaurant'] or 'row'}: {error}")
+            continue
+        try:
+            row = expense_row(record['Date'], record['Name'], record['Restaurant'], record['Amount'], record['Shares'], record['Currency'])
+            if row[5] == reporting:
+                row[5] = ''
+            if np.isnan(reporting_amount(row)):
+                unconverted.add(row[5])
+                continue
+            rows.append(row)
+        except ValueError:
+            incomplete += 1
     
-    # Add total row
-    total_row = pd.Series({
-        'Katy': final_table['Katy'].sum(),
-        'Sebastien': final_table['Sebastien'].sum(),
-        'Monthly Difference': final_table['Monthly Difference'].sum(),
-        'Running Balance': final_table['Running Balance'].iloc[-1],
-        'Katy (Count)': final_table['Katy (Count)'].sum(),
-        'Sebastien (Count)': final_table['Sebastien (Count)'].sum(),
-        'Count Difference': final_table['Count Difference'].sum()
-    })
-    final_table.loc['Total'] = total_row
+    if incomplete:
+        st.warning(f"{incomplete} row(s) are incomplete and will not be added")
+    if invalid_shares:
+        st.warning("Fix \"Shared by\" to add these rows: " + "; ".join(invalid_shares))
+    for code in sorted(unconverted):
+        st.warning(f"{missing_rate_message(code)}; those rows will not be added")
+    if rows:
+        st.info(f"Ready to add {len(rows)} expense(s) totalling ${sum(float(row[3]) for row in rows):.2f}")
     
-    # Reorder columns for better readability
-    column_order = [
-        'Katy',
-        'Sebastien',
-        'Monthly Difference',
-        'Running Balance',
-        'Katy (Count)',
-        'Sebastien (Count)',
-        'Count Difference'
-    ]
-    final_table = final_table[column_order]
+    duplicates = expense_index.duplicates(rows)
+    allow_duplicates = False
+    if duplicates:
+        st.warning(f"⚠️ {len(duplicates)} row(s) match an expense that is already recorded or repeated in the grid")
+        allow_duplicates = st.checkbox("Add them anyway", key="batch_entry_allow_duplicates")
     
-    # For charts - create a copy of the dataframe without the Total row
-    chart_df = df.copy()
+    blocked = not rows or bool(duplicates and not allow_duplicates)
+    if st.button(f"➕ Add {len(rows)} expense(s)", disabled=blocked, key="batch_entry_submit", type="primary"):
+        try:
+            append_expenses(service, rows, 'batch_entry', expense_index)
+            st.session_state.batch_entry_version += 1
+            st.success(f"✅ Successfully added {len(rows)} expense(s)!")
+            st.rerun()
+        except Exception as e:
+            st.error(f"An error occurred: {str(e)}")
+
+# ===== Bulk Import =====
+
+def render_bulk_import(service, participants, expense_index):
+    """Upload widget that dedupes a statement against the sheet and appends it in batches"""
+    uploaded = st.file_uploader(
+        "Card statement or expense export",
+        type=['csv', 'ofx', 'qfx'],
+        key="bulk_import_file"
+    )
+    default_name = st.selectbox(
+        "Paid by (used when the file has no name column)",
+        participants,
+        key="bulk_import_name"
+    )
+    if uploaded is None:
+        return
     
-    return final_table, chart_df
-
-def prepare_chart_data(df):
-    """Prepare dataframes for various charts"""
-    # Monthly spending by person
-    monthly_by_person = df.copy()
-    monthly_by_person['Month'] = monthly_by_person['Date'].dt.strftime('%Y-%m')
-    monthly_by_person = monthly_by_person.groupby(['Month', 'Name'])['Amount'].sum().reset_index()
+    try:
+        parsed = importers.read_expenses(importers.text_stream(uploaded), uploaded.name, default_name)
+        plan = importers.plan_import(parsed, index=expense_index)
+    except (importers.UnreadableRow, UnicodeDecodeError) as e:
+        st.error(f"Could not read {uploaded.name}: {str(e)}")
+        return
     
-    # Restaurant frequency
-    restaurant_count = df.groupby('Restaurant').size().reset_index(name='Count')
-    restaurant_count = restaurant_count.sort_values('Count', ascending=False)
+    st.write(f"{uploaded.name}: {plan.summary()}")
+    if plan.rows:
+        st.dataframe(pd.DataFrame(plan.rows, columns=COLUMNS[:4]), hide_index=True, use_container_width=True, height=250)
+    if plan.errors:
+        st.warning("Skipped unreadable lines: " + "; ".join(f"{pos}: {msg}" for pos, msg in plan.errors[:10]))
     
-    # Spending by restaurant
-    restaurant_amount = df.groupby('Restaurant')['Amount'].sum().reset_index()
-    restaurant_amount = restaurant_amount.sort_values('Amount', ascending=False)
+    if st.button(f"📥 Import {len(plan.rows)} expense(s)", disabled=not plan.rows, key="bulk_import_submit"):
+        progress_bar = st.progress(0.0, text="Importing...")
+        try:
+            append_expenses(
+                service, plan.rows, 'bulk_import', expense_index,
+                progress=lambda done, total: progress_bar.progress(done / total, text=f"Imported {done} of {total}")
+            )
+            st.success(f"✅ Imported {len(plan.rows)} expense(s)")
+            st.rerun()
+        except Exception as e:
+            st.error(f"Import stopped: {str(e)}")
+
+# ===== Presentation Functions =====
+
+# Beyond this many participants the Add Expense form lists names in a selectbox
+NAME_CHECKBOX_LIMIT = 4
+
+def group_label(participants):
+    """How the header refers to the group"""
+    if len(participants) <= 3:
+        return " & ".join(participants)
+    return f"{len(participants)} people"
+
+SUMMARY_DIFF_COLUMNS = ['Monthly Difference', 'Running Balance', 'Count Difference']
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def build_summary_presentation(data_version, _summary_table):
+    """Format the summary table once per data version for native rendering.
+
+    Difference columns are turned into text with a colored marker so that the
+    table renders through column configs instead of a pandas Styler.
+    """
+    presentation = _summary_table.copy()
+    column_config = {}
+
+    for col in presentation.columns:
+        is_amount = not col.endswith(' (Count)') and col != 'Count Difference'
+        if col in SUMMARY_DIFF_COLUMNS:
+            values = presentation[col].to_numpy(dtype=float)
+            marker = np.where(values > 0, '🟢 ', np.where(values < 0, '🔴 ', ''))
+            formatter = '${:,.2f}'.format if is_amount else '{:.0f}'.format
+            presentation[col] = marker + presentation[col].map(formatter).to_numpy(dtype=object)
+            column_config[col] = st.column_config.TextColumn(col)
+        elif is_amount:
+            column_config[col] = st.column_config.NumberColumn(col, format="$%.2f")
+        else:
+            column_config[col] = st.column_config.NumberColumn(col, format="%d")
+
+    return presentation, column_config
+
+# ===== Chart Functions =====
+
+def build_top_restaurants_chart(restaurant_count, limit=5):
+    """Bar chart of the most visited restaurants"""
+    top_restaurants = restaurant_count.head(limit)
     
-    # Recent trends (last 3 months)
-    three_months_ago = datetime.now() - timedelta(days=90)
-    recent_df = df[df['Date'] > pd.Timestamp(three_months_ago)]
+    return alt.Chart(top_restaurants).mark_bar().encode(
+        x=alt.X('Count:Q', title='Visit Count'),
+        y=alt.Y('Restaurant:N', title='Restaurant', sort='-x'),
+        color=alt.Color('Count:Q', scale=alt.Scale(scheme='blues')),
+        tooltip=['Restaurant', 'Count']
+    ).properties(
+        title='Most Visited Restaurants'
+    )
+
+def build_recent_trends_chart(monthly_by_person, months=6):
+    """Line chart of spending per person over the most recent months"""
+    recent_months = monthly_by_person.sort_values('Month', ascending=False)
+    if len(recent_months['Month'].unique()) > months:
+        last_months = recent_months['Month'].unique()[:months]
+        recent_months = recent_months[recent_months['Month'].isin(last_months)]
     
-    return {
-        'monthly_by_person': monthly_by_person,
-        'restaurant_count': restaurant_count,
-        'restaurant_amount': restaurant_amount,
-        'recent': recent_df
-    }
+    # Create a list of months in chronological order for sorting
+    month_order = sorted(recent_months['Month'].unique())
+    
+    return alt.Chart(recent_months).mark_line(point=True).encode(
+        x=alt.X('Month:N', title='Month', sort=month_order),  # Sort in chronological order
+        y=alt.Y('Amount:Q', title='Amount ($)'),
+        color=alt.Color('Name:N', title='Person'),
+        tooltip=['Month', 'Name', alt.Tooltip('Amount:Q', format='$.2f')]
+    ).properties(
+        title='Monthly Spending Trends'
+    )
 
-def calculate_balance(summary_table):
-    """Calculate who owes who based on the summary table"""
-    if 'Total' in summary_table.index and 'Running Balance' in summary_table.columns:
-        # Get the total amounts spent by each person
-        katy_total = summary_table.loc['Total', 'Katy']
-        sebastien_total = summary_table.loc['Total', 'Sebastien']
-        
-        # Calculate the overall total
-        overall_total = katy_total + sebastien_total
+def build_monthly_comparison_chart(monthly_by_person, resolution='month'):
+    """Bar chart comparing spending per person, bucketed to the given resolution"""
+    period_data = rebucket_monthly(monthly_by_person, resolution)
+    period_label = TIME_RESOLUTIONS[resolution]['label']
+    
+    # Sort periods in chronological order
+    period_order = sorted(period_data['Month'].unique())
+    
+    title = 'Monthly Spending Comparison' if resolution == 'month' else f'Spending Comparison by {period_label}'
+    return alt.Chart(period_data).mark_bar().encode(
+        x=alt.X('Month:N', title=period_label, sort=period_order),
+        y=alt.Y('Amount:Q', title='Amount ($)'),
+        color=alt.Color('Name:N', title='Person'),
+        tooltip=[alt.Tooltip('Month:N', title=period_label), 'Name', alt.Tooltip('Amount:Q', format='$.2f')]
+    ).properties(
+        title=title
+    )
+
+def build_top_spending_chart(restaurant_amount, limit=5):
+    """Bar chart of the restaurants with the highest total spending"""
+    top_restaurants_amount = restaurant_amount.head(limit)
+    
+    return alt.Chart(top_restaurants_amount).mark_bar().encode(
+        x=alt.X('Amount:Q', title='Total Spent ($)'),
+        y=alt.Y('Restaurant:N', title='Restaurant', sort='-x'),
+        color=alt.Color('Amount:Q', scale=alt.Scale(scheme='greens')),
+        tooltip=['Restaurant', alt.Tooltip('Amount:Q', format='$.2f')]
+    ).properties(
+        title=f'Top {limit} Restaurants by Spending'
+    )
+
+def build_visit_donut_chart(visit_data):
+    """Donut chart of visits per person with the total in the center"""
+    visit_data = visit_data.copy()
+    total_visits = visit_data['Visits'].sum()
+    visit_data['Percentage'] = visit_data['Visits'] / total_visits
+    
+    # The couple keeps its two colors; larger groups need a wider palette
+    if len(visit_data) <= 2:
+        color_scale = alt.Scale(range=['#FF9AA2', '#86C7F3'])
+    else:
+        color_scale = alt.Scale(scheme='tableau20')
+    
+    visit_chart = alt.Chart(visit_data).mark_arc(innerRadius=50).encode(
+        theta=alt.Theta(field="Visits", type="quantitative"),
+        color=alt.Color(field="Person", type="nominal", scale=color_scale),
+        tooltip=['Person', 'Visits', alt.Tooltip('Percentage:Q', format='.1%')]
+    ).properties(
+        title='Restaurant Visits by Person',
+        width=300,
+        height=300
+    )
+    
+    # Add text in the center
+    text = alt.Chart(pd.DataFrame({'text': [f'Total: {int(total_visits)}']})).mark_text(
+        fontSize=20,
+        font='Arial',
+        align='center'
+    ).encode(
+        text='text:N'
+    )
+    
+    return visit_chart + text
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def get_chart_spec(chart_id, data_version, view_options, _build):
+    """Build and serialize a chart once per (chart id, data version, view options).
+    
+    The Vega-Lite spec, including its inlined data, is shared across reruns
+    and sessions so unchanged charts are never re-serialized.
+    """
+    with alt.data_transformers.disable_max_rows():
+        return _build().to_dict()
+
+def render_cached_chart(chart_id, data_version, build, **view_options):
+    """Render a chart from the spec cache"""
+    with span(f'chart: {chart_id}'):
+        spec = get_chart_spec(chart_id, data_version, tuple(sorted(view_options.items())), build)
+        st.vega_lite_chart(spec, use_container_width=True)
+
+# ===== Sheets Metrics Export =====
+
+# Set RESTAURANT_TRACKER_METRICS_FILE to write Prometheus text metrics after every rerun
+METRICS_FILE_ENV = 'RESTAURANT_TRACKER_METRICS_FILE'
+# Set RESTAURANT_TRACKER_METRICS_PORT to serve them on http://127.0.0.1:<port>/metrics
+METRICS_PORT_ENV = 'RESTAURANT_TRACKER_METRICS_PORT'
+
+@st.cache_resource
+def start_metrics_server(port):
+    """Start the /metrics endpoint once per process"""
+    return metrics.start_http_server(port)
+
+def export_sheets_metrics():
+    """Publish Sheets call metrics through the configured file and/or endpoint"""
+    port = os.environ.get(METRICS_PORT_ENV)
+    if port:
+        try:
+            start_metrics_server(int(port))
+        except (OSError, ValueError) as e:
+            print(f"Could not start metrics endpoint on port {port}: {e}", file=sys.stderr)
+    
+    metrics_file = os.environ.get(METRICS_FILE_ENV)
+    if metrics_file:
+        try:
+            metrics.write_textfile(metrics_file)
+        except OSError as e:
+            print(f"Could not write metrics file {metrics_file}: {e}", file=sys.stderr)
+
+# ===== Memory Profiling Panel =====
+
+# Set RESTAURANT_TRACKER_MEMPROFILE=1 to trace allocations per pipeline stage
+MEMPROFILE_ENV = 'RESTAURANT_TRACKER_MEMPROFILE'
+
+def render_memory_panel():
+    """Sidebar report of per-stage allocations and the largest frames"""
+    if not PROFILER.enabled:
+        return
+    
+    report = PROFILER.report()
+    with st.sidebar.expander("🧠 Memory by stage"):
+        st.write(f"Currently traced: {report['traced_bytes'] / 2**20:.1f} MiB")
         
-        # Each person should pay half of the overall total
-        half_total = overall_total / 2
+        if report['stages']:
+            stages = pd.DataFrame(report['stages'])
+            stages['Delta MiB'] = stages['delta_bytes'] / 2**20
+            stages['Peak MiB'] = stages['peak_bytes'] / 2**20
+            st.dataframe(
+                stages[['stage', 'Delta MiB', 'Peak MiB']],
+                column_config={
+                    'Delta MiB': st.column_config.NumberColumn(format="%.2f"),
+                    'Peak MiB': st.column_config.NumberColumn(format="%.2f"),
+                },
+                hide_index=True,
+                use_container_width=True
+            )
         
-        # Calculate how much each person has paid vs should have paid
-        katy_diff = katy_total - half_total
-        sebastien_diff = sebastien_total - half_total
+        if report['objects']:
+            st.write("Retained size of pipeline objects")
+            objects = pd.DataFrame(
+                [(name, size / 2**20) for name, size in report['objects'].items()],
+                columns=['Object', 'MiB']
+            )
+            st.dataframe(
+                objects,
+                column_config={'MiB': st.column_config.NumberColumn(format="%.2f")},
+                hide_index=True,
+                use_container_width=True
+            )
         
-        if abs(katy_diff) < 0.01:  # Essentially even
-            return "Even", 0, "neutral"
-        elif katy_diff > 0:
-            # Katy paid more than her share
-            return "Sebastien owes Katy", abs(katy_diff), "positive"
-        else:
-            # Sebastien paid more than his share
-            return "Katy owes Sebastien", abs(katy_diff), "negative"
+        for stage in report['stages']:
+            if stage['top_sites']:
+                st.write(f"Top allocation sites: {stage['stage']}")
+                sites = pd.DataFrame(stage['top_sites'])
+                sites['KiB'] = sites['size_diff'] / 1024
+                st.dataframe(
+                    sites[['site', 'KiB', 'count_diff']],
+                    column_config={'KiB': st.column_config.NumberColumn(format="%.1f")},
+                    hide_index=True,
+                    use_container_width=True
+                )
+
+# ===== Developer Timing Panel =====
+
+# Set RESTAURANT_TRACKER_TIMING_PANEL=1 to show per-rerun span waterfalls in the sidebar
+TIMING_PANEL_ENV = 'RESTAURANT_TRACKER_TIMING_PANEL'
+# Set RESTAURANT_TRACKER_TRACE_FILE=/path/traces.jsonl to append every rerun trace
+TRACE_FILE_ENV = 'RESTAURANT_TRACKER_TRACE_FILE'
+TIMING_PANEL_RERUNS = 20
+
+def record_trace(trace):
+    """Keep the last reruns in the session and optionally append them to the trace file"""
+    if 'rerun_traces' not in st.session_state:
+        st.session_state.rerun_traces = deque(maxlen=TIMING_PANEL_RERUNS)
+    st.session_state.rerun_traces.append(trace.to_dict())
     
-    return "Cannot calculate balance", 0, "neutral"
+    trace_file = os.environ.get(TRACE_FILE_ENV)
+    if trace_file:
+        try:
+            append_jsonl(trace, trace_file)
+        except OSError as e:
+            print(f"Could not write trace file {trace_file}: {e}", file=sys.stderr)
+
+def build_waterfall_chart(trace):
+    """Horizontal bars from span start to span end, one row per span"""
+    spans = pd.DataFrame(trace['spans'])
+    spans['end_ms'] = spans['start_ms'] + spans['duration_ms']
+    spans['Stage'] = [f"{'· ' * depth}{name}" for depth, name in zip(spans['depth'], spans['name'])]
+    
+    return alt.Chart(spans).mark_bar().encode(
+        x=alt.X('start_ms:Q', title='Milliseconds since rerun start'),
+        x2='end_ms:Q',
+        y=alt.Y('Stage:N', title=None, sort=None),
+        color=alt.Color('depth:O', legend=None),
+        tooltip=['name', alt.Tooltip('start_ms:Q', format='.1f'), alt.Tooltip('duration_ms:Q', format='.1f')]
+    )
+
+def render_timing_panel():
+    """Opt-in sidebar panel with the last reruns as span waterfalls"""
+    if not os.environ.get(TIMING_PANEL_ENV) or not st.session_state.get('rerun_traces'):
+        return
+    
+    traces = list(st.session_state.rerun_traces)[::-1]
+    with st.sidebar.expander("⏱️ Rerun timings", expanded=True):
+        history = pd.DataFrame({
+            'Rerun': [trace['started_at'][11:23] for trace in traces],
+            'Total ms': [trace['duration_ms'] for trace in traces],
+            'Status': [trace['status'] for trace in traces],
+        })
+        st.dataframe(
+            history,
+            column_config={'Total ms': st.column_config.NumberColumn(format="%.1f")},
+            hide_index=True,
+            use_container_width=True
+        )
+        
+        choice = st.selectbox(
+            "Waterfall for rerun",
+            range(len(traces)),
+            format_func=lambda i: f"{history['Rerun'][i]} ({history['Total ms'][i]:.0f} ms)",
+            key="timing_panel_rerun"
+        )
+        if traces[choice]['spans']:
+            st.altair_chart(build_waterfall_chart(traces[choice]), use_container_width=True)
 
 # ===== Main App Function =====
 def main():
+    script_start = time.perf_counter()
+    configure_page()
+    
+    if os.environ.get(MEMPROFILE_ENV):
+        PROFILER.enable()
+    
+    trace = start_trace('rerun')
+    status = 'interrupted'
+    try:
+        render_app()
+        status = 'ok'
+    except Exception:
+        status = 'error'
+        raise
+    finally:
+        # st.rerun() and st.stop() end the run early through control-flow exceptions
+        finish_trace(status)
+        record_trace(trace)
+        export_sheets_metrics()
+    
+    render_timing_panel()
+    render_memory_panel()
+    render_startup_report(script_start)
+
+def render_app():
     # Initialize session state variables for deletion confirmation
     if 'confirm_deletion' not in st.session_state:
         st.session_state.confirm_deletion = False
@@ -382,11 +1084,14 @@ def main():
         
     def perform_deletion():
         try:
-            deleted_count = 0
-            # Delete in reverse order to maintain correct indices
-            for idx in sorted(st.session_state.rows_to_delete, reverse=True):
-                if delete_row(service, idx + 2):  # +2 because of header and 0-based index
-                    deleted_count += 1
+            # One batched, journaled request; +2 because of header and 0-based index
+            indices = sorted(st.session_state.rows_to_delete)
+            deleted_count = get_journal().delete_rows(
+                service,
+                [idx + 2 for idx in indices],
+                [sheet_data[idx + 1] for idx in indices],
+                f"Delete {len(indices)} transaction(s)"
+            )
             
             st.session_state.delete_success = True
             st.session_state.delete_message = f"✅ Successfully deleted {deleted_count} transaction(s)"
@@ -400,86 +1105,100 @@ def main():
     
     # App Header
     st.markdown('<p style="font-size: 1.5rem; font-weight: 600; color: #FF4B4B; margin-bottom: 0.3rem; text-align: left; margin-left: 0; padding-left: 0;">Restaurant Expense Tracker</p>', unsafe_allow_html=True)
-    st.markdown('<p style="font-size: 1.1rem; font-weight: 400; color: white; margin-top: 0; text-align: left; margin-left: 0; padding-left: 0; text-shadow: 0px 0px 1px rgba(0,0,0,0.2);">Keep track of shared dining expenses between Katy & Sebastien</p>', unsafe_allow_html=True)
+    st.markdown(f'<p style="font-size: 1.1rem; font-weight: 400; color: white; margin-top: 0; text-align: left; margin-left: 0; padding-left: 0; text-shadow: 0px 0px 1px rgba(0,0,0,0.2);">Keep track of shared dining expenses between {group_label(PARTICIPANTS)}</p>', unsafe_allow_html=True)
     
     # Initialize service early
     try:
-        service = setup_google_sheets()
-        sheet_data = fetch_sheet_data(service)
+        with span('setup_google_sheets'):
+            service = setup_google_sheets()
+        with span('fetch_sheet_data'):
+            sheet_data = fetch_sheet_data(service)
+        data_version = compute_data_version(sheet_data)
+        # Shared duplicate index; rebuilt only when the sheet contents changed
+        expense_index = get_expense_index()
+        expense_index.sync(data_version, sheet_data[1:])
+        # Recurring expenses that came due go out in one append, then the sheet is read again
+        materialized = materialize_recurring(service, expense_index)
+        if materialized:
+            st.toast(f"🔁 Added {len(materialized)} recurring expense(s)")
+            sheet_data = fetch_sheet_data(service)
+            data_version = compute_data_version(sheet_data)
+            expense_index.sync(data_version, sheet_data[1:])
+        PROFILER.record_frame('sheet_data', sheet_data)
+        # Record changes made outside the app so point-in-time views stay complete
+        get_history().sync(sheet_data, data_version)
+        participants = ledger_participants(sheet_data)
+        restaurant_index = get_restaurant_index()
+        restaurant_index.sync(data_version, sheet_data[1:])
+        # Converted amounts also depend on the rate table
+        view_version = f'{data_version}-{get_fx_rates().version}'
         
         if sheet_data and len(sheet_data) > 1:
-            summary_table, chart_df = create_summary_table(sheet_data)
-            chart_data = prepare_chart_data(chart_df)
+            with span('create_summary_table'):
+                summary_table, chart_df = build_summary(data_version, get_fx_rates().version, tuple(participants), sheet_data)
+            get_budget_tracker().sync(view_version, summary_table, participants)
+            missing_rates = get_fx_rates().missing(chart_df['Currency'])
+            if missing_rates:
+                st.warning(f"No exchange rates for {', '.join(missing_rates)}; those expenses are left out of the totals")
+            outside_group = unknown_payers(sheet_data, participants)
+            if outside_group:
+                st.warning(
+                    f"Expenses paid by {', '.join(outside_group)} are left out of the balances; "
+                    f"add them to {PARTICIPANTS_ENV} or name them in a Shares cell"
+                )
+            with span('prepare_chart_data'):
+                chart_data = prepare_chart_data(chart_df, aliases=get_alias_table())
+            PROFILER.record_frame('summary_table', summary_table)
+            PROFILER.record_frame('chart_df', chart_df)
+            PROFILER.record_frame('chart_data', chart_data)
             
-            # Calculate the actual total difference
-            total_katy = summary_table.loc['Total', 'Katy']
-            total_sebastien = summary_table.loc['Total', 'Sebastien']
-            total_amount = total_katy + total_sebastien
-            should_have_paid = total_amount / 2
-            amount_diff = total_katy - should_have_paid  # Positive means Katy paid more
+            # Who owes whom, from the settlement of everyone's totals under the split rules
+            owed = compute_owed_totals(view_version, get_split_rules().version, tuple(participants), chart_df)
+            balance_text, balance_amount, balance_class = calculate_balance(summary_table, owed)
+            totals = summary_table.loc['Total']
             
-            # Determine who owes who based on the amount difference
-            if abs(amount_diff) < 0.01:  # Essentially zero
-                balance_text = "Even"
-                balance_class = "neutral"
-                balance_amount = 0
-            elif amount_diff > 0:
-                # Katy paid more
-                balance_text = "Sebastien owes Katy"
-                balance_class = "positive"
-                balance_amount = abs(amount_diff)
+            # Per-person cards for a couple; group totals for larger groups
+            if len(participants) <= 2:
+                cards = [(balance_text, f"${balance_amount:.2f}")]
+                cards += [(f"{name}'s Total Spending", f"${totals[name]:.2f}") for name in participants]
+                cards += [(f"{name}'s Meals", f"{int(totals[count_column(name)])}") for name in participants]
             else:
-                # Sebastien paid more
-                balance_text = "Katy owes Sebastien"
-                balance_class = "negative"
-                balance_amount = abs(amount_diff)
-            
-            # Remove the standalone Current Balance box and add it to the metrics row
-            col1, col2, col3, col4, col5 = st.columns(5)
+                cards = [
+                    (balance_text, f"${balance_amount:.2f}"),
+                    ("Group Total Spending", f"${totals[participants].sum():.2f}"),
+                    ("Meals", f"{int(totals[[count_column(name) for name in participants]].sum())}"),
+                    ("Participants", f"{len(participants)}"),
+                ]
             
-            with col1:
-                st.markdown(f"""
-                <div class="metric-card">
-                    <div style="font-size: 1rem; color: black; font-weight: 500; margin-bottom: 8px;">{balance_text}</div>
-                    <div class="metric-value">${balance_amount:.2f}</div>
-                </div>
-                """, unsafe_allow_html=True)
+            for col, (label, value) in zip(st.columns(len(cards)), cards):
+                with col:
+                    st.markdown(f"""
+                    <div class="metric-card">
+                        <div style="font-size: 1rem; color: black; font-weight: 500; margin-bottom: 8px;">{label}</div>
+                        <div class="metric-value">{value}</div>
+                    </div>
+                    """, unsafe_allow_html=True)
             
-            with col2:
-                st.markdown(f"""
-                <div class="metric-card">
-                    <div style="font-size: 1rem; color: black; font-weight: 500; margin-bottom: 8px;">Katy's Total Spending</div>
-                    <div class="metric-value">${summary_table.loc['Total', 'Katy']:.2f}</div>
-                </div>
-                """, unsafe_allow_html=True)
+            render_budget_alerts(datetime.now().strftime('%Y-%m'))
             
-            with col3:
-                st.markdown(f"""
-                <div class="metric-card">
-                    <div style="font-size: 1rem; color: black; font-weight: 500; margin-bottom: 8px;">Sebastien's Total Spending</div>
-                    <div class="metric-value">${summary_table.loc['Total', 'Sebastien']:.2f}</div>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            with col4:
-                st.markdown(f"""
-                <div class="metric-card">
-                    <div style="font-size: 1rem; color: black; font-weight: 500; margin-bottom: 8px;">Katy's Meals</div>
-                    <div class="metric-value">{int(summary_table.loc['Total', 'Katy (Count)'])}</div>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            with col5:
-                st.markdown(f"""
-                <div class="metric-card">
-                    <div style="font-size: 1rem; color: black; font-weight: 500; margin-bottom: 8px;">Sebastien's Meals</div>
-                    <div class="metric-value">{int(summary_table.loc['Total', 'Sebastien (Count)'])}</div>
-                </div>
-                """, unsafe_allow_html=True)
+            transfers = settlement(summary_table, owed)
+            if len(transfers) > 1:
+                with st.expander("💸 How to settle up"):
+                    st.dataframe(
+                        pd.DataFrame(transfers, columns=['From', 'To', 'Amount']),
+                        hide_index=True,
+                        use_container_width=True,
+                        column_config={'Amount': st.column_config.NumberColumn("Amount", format="$%.2f")}
+                    )
         
     except Exception as e:
         st.error(f"Error initializing data: {str(e)}")
         sheet_data = []
+        data_version = compute_data_version(sheet_data)
+        view_version = data_version
+        participants = list(PARTICIPANTS)
+        expense_index = get_expense_index()
+        restaurant_index = get_restaurant_index()
         summary_table = pd.DataFrame()
         chart_df = pd.DataFrame()
         chart_data = {}
@@ -488,17 +1207,12 @@ def main():
     tab1, tab2, tab3 = st.tabs(["➕ Add Expense", "🔍 View/Edit Transactions", "📊 Analytics"])
     
     # Tab 1: Add Expense
-    with tab1:
+    with tab1, span('tab: add expense'):
         st.markdown('<div class="card">', unsafe_allow_html=True)
         st.markdown('<p class="subheader">Add New Expense</p>', unsafe_allow_html=True)
         
-        # Get recent restaurants for autocomplete
-        recent_restaurants = []
-        try:
-            if 'chart_data' in locals() and 'restaurant_count' in chart_data:
-                recent_restaurants = chart_data['restaurant_count']['Restaurant'].tolist()
-        except:
-            recent_restaurants = ["Imperial", "Ramen", "Baton Rouge", "Marathon", "Miss Pho", "Indian", "Starbucks"]
+        # Known restaurants, most visited and most recent first
+        recent_restaurants = restaurant_index.complete('', limit=None)
         
         # Store last used values in session state for convenience
         if 'last_name' not in st.session_state:
@@ -510,14 +1224,27 @@ def main():
         
         with col1:
             st.write("Select your name:")
-            name_options = ["Katy", "Sebastien"]
+            name_options = participants
             selected_name = st.session_state.last_name if st.session_state.last_name in name_options else ""
             
             # Create a row of radio-like buttons using st.columns
-            cols = st.columns(len(name_options))
+            cols = st.columns(len(name_options)) if len(name_options) <= NAME_CHECKBOX_LIMIT else []
+            
+            # Larger groups pick from a list instead of a row of checkboxes
+            if not cols:
+                chosen = st.selectbox(
+                    "Select your name",
+                    [""] + name_options,
+                    index=([""] + name_options).index(selected_name),
+                    label_visibility="collapsed",
+                    key="tab1_name_select"
+                )
+                if chosen != selected_name:
+                    st.session_state.last_name = chosen
+                    st.rerun()
             
             # Simple direct button approach with clear visual feedback
-            for i, name in enumerate(name_options):
+            for i, name in enumerate(name_options if cols else []):
                 is_selected = selected_name == name
                 button_style = "primary" if is_selected else "secondary"
                 
@@ -552,6 +1279,15 @@ def main():
             
             if default_restaurant == "":
                 restaurant = st.text_input("Or enter a custom restaurant", key="tab1_custom_restaurant")
+                
+                # Offer known restaurants matching what has been typed so far
+                suggestions = restaurant_index.complete(restaurant, limit=5) if restaurant else []
+                suggestions = [name for name in suggestions if name.casefold() != restaurant.strip().casefold()]
+                if suggestions:
+                    st.caption("Did you mean:")
+                    suggestion_cols = st.columns(len(suggestions))
+                    for i, name in enumerate(suggestions):
+                        suggestion_cols[i].button(name, key=f"tab1_suggestion_{i}", on_click=choose_restaurant, args=(name,))
             else:
                 restaurant = default_restaurant
                 st.session_state.last_restaurant = default_restaurant
@@ -561,14 +1297,58 @@ def main():
         # FIX 2: Changed bill amount input to not show 0.00 by default
         # Using an empty label with markdown label above
         st.markdown('<label>Enter total bill amount</label>', unsafe_allow_html=True)
-        bill_amount = st.number_input(" ", min_value=0.0, step=0.01, value=None, label_visibility="collapsed")
+        amount_col, currency_col = st.columns([3, 1])
+        with amount_col:
+            bill_amount = st.number_input(" ", min_value=0.0, step=0.01, value=None, label_visibility="collapsed", key="tab1_amount")
+        with currency_col:
+            rates = get_fx_rates()
+            currency = st.selectbox("Currency", rates.currencies, label_visibility="collapsed", key="tab1_currency")
         
         # Preview expense entry - check if bill_amount is not None before comparing
+        allow_duplicate = False
         if user_name and restaurant and bill_amount is not None and bill_amount > 0:
-            st.info(f"Ready to add: ${bill_amount:.2f} paid by {user_name} at {restaurant} on {date.strftime('%Y-%m-%d')}")
+            converted = rates.rates_for(currency, np.array([np.datetime64(date, 'ns')]))[0] * bill_amount
+            if np.isnan(converted):
+                st.error(missing_rate_message(currency))
+            elif currency == rates.reporting:
+                st.info(f"Ready to add: ${bill_amount:.2f} paid by {user_name} at {restaurant} on {date.strftime('%Y-%m-%d')}")
+            else:
+                st.info(f"Ready to add: {bill_amount:.2f} {currency} (≈ ${converted:.2f} {rates.reporting}) paid by {user_name} at {restaurant} on {date.strftime('%Y-%m-%d')}")
+            
+            # Remaining budget for the expense's month, before and after this bill
+            month = date.strftime('%Y-%m')
+            statuses = [] if np.isnan(converted) else get_budget_tracker().status(get_budgets(), month, user_name)
+            for status in statuses:
+                after = status.after(converted)
+                if after.level == 'over':
+                    st.warning(f"⚠️ This puts {status.label} ${-after.remaining:,.2f} over the {month} budget")
+                else:
+                    st.caption(f"🎯 {budget_message(status)} in {month}, ${after.remaining:,.2f} after this expense")
+            if expense_index.contains(expense_row(date, user_name, restaurant, bill_amount)):
+                st.warning("⚠️ An identical expense (same date, name, restaurant and amount) is already recorded")
+                allow_duplicate = st.checkbox("Add it anyway", key="tab1_allow_duplicate")
+        
+        # Who shared this bill, stored with the expense; empty means everyone equally
+        shares = ''
+        if st.checkbox("Custom split for this expense", key="tab1_custom_split"):
+            shared_with = st.multiselect("Shared with", participants, default=participants, key="tab1_shared_with")
+            if shared_with:
+                custom_split = st.data_editor(
+                    pd.DataFrame([{name: 1.0 for name in shared_with}]),
+                    hide_index=True,
+                    use_container_width=True,
+                    column_config={name: st.column_config.NumberColumn(name, min_value=0.0, step=1.0) for name in shared_with},
+                    key=f"tab1_split_weights_{len(shared_with)}"
+                ).iloc[0].to_dict()
+                if any(weight > 0 for weight in custom_split.values()):
+                    shares = format_shares(custom_split, participants)
+                else:
+                    st.warning("Give at least one person a weight above 0")
+            else:
+                st.warning("Pick at least one person who shared this bill")
         
         # Submit button with better styling
-        submit_button = st.button("➕ Add Expense", type="primary", use_container_width=True)
+        submit_button = st.button("➕ Add Expense", type="primary", use_container_width=True, key="add_expense")
         
         if submit_button:
             final_name = user_name if user_name else default_name
@@ -580,29 +1360,47 @@ def main():
                         date.strftime('%Y-%m-%d'),
                         final_name,
                         final_restaurant,
-                        str(bill_amount)
+                        str(bill_amount),
+                        shares,
+                        '' if currency == rates.reporting else currency
                     ]
-                    result = update_sheet(service, values)
-                    
-                    # Success message with animation
-                    # Show success message
-                    st.success(f"✅ Successfully added ${bill_amount:.2f} expense at {final_restaurant}!")
-                    
-                    # Randomly select between the two available animations
-                    if np.random.choice([True, False]):
-                        st.balloons()
+                    if np.isnan(reporting_amount(values)):
+                        st.error(missing_rate_message(currency))
+                    elif expense_index.contains(values) and not allow_duplicate:
+                        st.warning("This expense is already recorded; tick \"Add it anyway\" to add it again")
+                    elif not append_expenses(service, [values], 'add_expense', expense_index):
+                        st.info("This expense was already added")
                     else:
-                        st.snow()
-                    # Auto-refresh after 2 seconds
-                    import time
-                    time.sleep(2)
-                    st.rerun()
+                        # Success message with animation
+                        # Show success message
+                        st.success(f"✅ Successfully added ${bill_amount:.2f} expense at {final_restaurant}!")
+                        
+                        # Randomly select between the two available animations
+                        if np.random.choice([True, False]):
+                            st.balloons()
+                        else:
+                            st.snow()
+                        # Auto-refresh after 2 seconds
+                        time.sleep(2)
+                        st.rerun()
                     
                 except Exception as e:
                     st.error(f"An error occurred: {str(e)}")
             else:
                 st.warning("Please fill in all fields and ensure bill amount is greater than 0")
         
+        # Stage several receipts and write them with a single append
+        with st.expander("🧾 Add several expenses at once"):
+            render_batch_entry(service, participants, restaurant_options, expense_index)
+        
+        # Standing lunches and meal plans, added automatically when they come due
+        with st.expander("🔁 Recurring expenses"):
+            render_recurring_editor(participants, restaurant_options)
+        
+        # Back-fill from card statements with a few batched appends
+        with st.expander("📥 Import expenses from CSV / OFX"):
+            render_bulk_import(service, participants, expense_index)
+        
         st.markdown('</div>', unsafe_allow_html=True)
         
         # Display analytics charts relevant to adding expenses
@@ -617,50 +1415,28 @@ def main():
                 
                 # Create a bar chart for top restaurants by count
                 if 'restaurant_count' in chart_data and not chart_data['restaurant_count'].empty:
-                    top_restaurants = chart_data['restaurant_count'].head(5)
-                    
-                    chart = alt.Chart(top_restaurants).mark_bar().encode(
-                        x=alt.X('Count:Q', title='Visit Count'),
-                        y=alt.Y('Restaurant:N', title='Restaurant', sort='-x'),
-                        color=alt.Color('Count:Q', scale=alt.Scale(scheme='blues')),
-                        tooltip=['Restaurant', 'Count']
-                    ).properties(
-                        title='Most Visited Restaurants'
+                    render_cached_chart(
+                        'top_restaurants', view_version,
+                        lambda: build_top_restaurants_chart(chart_data['restaurant_count'], limit=5),
+                        limit=5
                     )
-                    
-                    st.altair_chart(chart, use_container_width=True)
                 st.markdown('</div>', unsafe_allow_html=True)
             
             with col2:
                 st.markdown('<div class="card">', unsafe_allow_html=True)
                 st.subheader("Recent Spending")
                 
-                # Create a line chart for recent spending trends
+                # Create a line chart for recent spending trends (most recent 6 months)
                 if 'monthly_by_person' in chart_data and not chart_data['monthly_by_person'].empty:
-                    # Get most recent 6 months of data
-                    recent_months = chart_data['monthly_by_person'].sort_values('Month', ascending=False)
-                    if len(recent_months['Month'].unique()) > 6:
-                        last_6_months = recent_months['Month'].unique()[:6]
-                        recent_months = recent_months[recent_months['Month'].isin(last_6_months)]
-                    
-                    if not recent_months.empty:
-                        # Create a list of months in chronological order for sorting
-                        month_order = sorted(recent_months['Month'].unique())
-                        
-                        chart = alt.Chart(recent_months).mark_line(point=True).encode(
-                            x=alt.X('Month:N', title='Month', sort=month_order),  # Sort in chronological order
-                            y=alt.Y('Amount:Q', title='Amount ($)'),
-                            color=alt.Color('Name:N', title='Person'),
-                            tooltip=['Month', 'Name', alt.Tooltip('Amount:Q', format='$.2f')]
-                        ).properties(
-                            title='Monthly Spending Trends'
-                        )
-                        
-                        st.altair_chart(chart, use_container_width=True)
+                    render_cached_chart(
+                        'recent_trends', view_version,
+                        lambda: build_recent_trends_chart(chart_data['monthly_by_person'], months=6),
+                        months=6
+                    )
                 st.markdown('</div>', unsafe_allow_html=True)
     
     # Tab 2: View and Edit Transactions
-    with tab2:
+    with tab2, span('tab: view/edit'):
         st.markdown('<div class="card">', unsafe_allow_html=True)
         st.markdown('<p class="subheader">Transaction History</p>', unsafe_allow_html=True)
         
@@ -671,6 +1447,10 @@ def main():
             st.session_state.delete_success = False
         
         try:
+            # Every append, edit and delete can be reversed
+            if 'service' in locals():
+                render_undo_controls(service)
+            
             if sheet_data and len(sheet_data) > 1:
                 # Create DataFrame with proper column names
                 df = pd.DataFrame(sheet_data[1:], columns=sheet_data[0])
@@ -685,11 +1465,11 @@ def main():
                 col1, col2, col3 = st.columns(3)
                 
                 with col1:
-                    search_term = st.text_input("🔍 Search by restaurant", placeholder="Type to search...")
+                    search_term = st.text_input("🔍 Search by restaurant", placeholder="Type to search...", key="tab2_search")
                 
                 with col2:
-                    filter_options = ["All", "Katy", "Sebastien"]
-                    name_filter = st.selectbox("Filter by person", filter_options)
+                    filter_options = ["All"] + participants
+                    name_filter = st.selectbox("Filter by person", filter_options, key="tab2_name_filter")
                 
                 with col3:
                     # Get unique months from data
@@ -706,19 +1486,13 @@ def main():
                     months = ["All"] + sorted([m for m in df['Month'].unique().tolist() if m != 'Unknown'], reverse=True)
                     if 'Unknown' in df['Month'].unique():
                         months.append('Unknown')
-                    month_filter = st.selectbox("Filter by month", months)
+                    month_filter = st.selectbox("Filter by month", months, key="tab2_month_filter")
                 
                 # Apply filters
-                filtered_df = df.copy()
-                
-                if search_term:
-                    filtered_df = filtered_df[filtered_df[sheet_data[0][2]].str.contains(search_term, case=False)]
-                
-                if name_filter != "All":
-                    filtered_df = filtered_df[filtered_df[sheet_data[0][1]] == name_filter]
-                
-                if month_filter != "All":
-                    filtered_df = filtered_df[filtered_df['Month'] == month_filter]
+                with span('filter_transactions'):
+                    filtered_df = filter_transactions(df, sheet_data[0], search_term, name_filter, month_filter)
+                PROFILER.record_frame('transactions_df', df)
+                PROFILER.record_frame('filtered_df', filtered_df)
                 
                 # Display record count
                 st.write(f"Showing {len(filtered_df)} of {len(df)} records")
@@ -757,7 +1531,7 @@ def main():
                     sheet_data[0][1]: st.column_config.SelectboxColumn(
                         "Name",
                         help="User name",
-                        options=["Katy", "Sebastien"],
+                        options=participants,
                         required=True
                     ),
                     sheet_data[0][2]: st.column_config.TextColumn(
@@ -771,6 +1545,15 @@ def main():
                         step=0.01,
                         format="$%.2f"
                     ),
+                    sheet_data[0][4]: st.column_config.TextColumn(
+                        "Shared by",
+                        help="Who shared the bill, e.g. Katy,Sebastien or Katy:2,Sebastien:1 (empty: everyone)",
+                        validate=SHARES_PATTERN,
+                    ),
+                    sheet_data[0][5]: st.column_config.TextColumn(
+                        "Currency",
+                        help=f"Currency the bill was paid in (empty: {get_fx_rates().reporting})",
+                    ),
                     "Month": st.column_config.Column(
                         "Month",
                         help="Month of transaction",
@@ -783,15 +1566,16 @@ def main():
                 
                 # Create data editor with appropriate configuration
                 try:
-                    edited_df = st.data_editor(
-                        filtered_df,
-                        use_container_width=True,
-                        num_rows="fixed",
-                        column_config=column_config,
-                        hide_index=True,
-                        height=400,
-                        key="transaction_editor"
-                    )
+                    with span('data_editor'):
+                        edited_df = st.data_editor(
+                            filtered_df,
+                            use_container_width=True,
+                            num_rows="fixed",
+                            column_config=column_config,
+                            hide_index=True,
+                            height=400,
+                            key="transaction_editor"
+                        )
                 except Exception as e:
                     st.error(f"Error displaying data editor: {str(e)}")
                     # Fallback to non-editable display
@@ -821,26 +1605,14 @@ def main():
                                 break
                 
                 # Detect changes in edited_df vs original df
-                changes_made = False
-                changes = []
-                
-                for idx, row in edited_df.iterrows():
-                    # Find matching row in original df
-                    orig_idx = df.index[df[sheet_data[0][0]] == row[sheet_data[0][0]]].tolist()
-                    if orig_idx:
-                        orig_row = df.iloc[orig_idx[0]]
-                        
-                        # Check each field for changes
-                        for col in [sheet_data[0][1], sheet_data[0][2], sheet_data[0][3]]:
-                            if str(row[col]) != str(orig_row[col]):
-                                changes_made = True
-                                changes.append({
-                                    'row': orig_idx[0],
-                                    'col': col,
-                                    'col_idx': sheet_data[0].index(col),
-                                    'old_value': orig_row[col],
-                                    'new_value': row[col]
-                                })
+                with span('detect_changes'):
+                    changes = detect_changes(df, edited_df, sheet_data[0])
+                changes_made = bool(changes)
+                # A mistyped Shares cell is caught here rather than written to the sheet
+                invalid_shares = [
+                    (change['row'], error) for change in changes
+                    if change['col_idx'] == 4 and (error := shares_error(change['new_value']))
+                ]
                 
                 # Add spacing
                 st.write("")
@@ -850,19 +1622,24 @@ def main():
                 
                 # Submit modifications button
                 with col1:
-                    if changes_made:
+                    if invalid_shares:
+                        st.error("Fix \"Shared by\" before saving: " + "; ".join(
+                            f"{sheet_data[row + 1][2]} on {sheet_data[row + 1][0]}: {error}" for row, error in invalid_shares
+                        ))
+                    elif changes_made:
                         st.info(f"{len(changes)} changes detected. Click to save.")
                     
                     submit_button = st.button(
                         "💾 Save Changes", 
                         key="submit_mods", 
-                        disabled=not changes_made,
+                        disabled=not changes_made or bool(invalid_shares),
                         use_container_width=True,
                         type="primary"
                     )
                     
-                    if submit_button and changes:
+                    if submit_button and changes and not invalid_shares:
                         updated_count = 0
+                        updated_cells = []
                         try:
                             for change in changes:
                                 # Get the actual row number in the sheet (adding 2 for header and 1-based indexing)
@@ -878,7 +1655,13 @@ def main():
                                 
                                 if success:
                                     updated_count += 1
+                                    updated_cells.append((
+                                        sheet_row, change['col_idx'],
+                                        sheet_data[sheet_row - 1][change['col_idx']], str(change['new_value'])
+                                    ))
                             
+                            if updated_cells:
+                                get_journal().record(journal.edited(updated_cells, f"Edit {len(updated_cells)} field(s)"))
                             if updated_count > 0:
                                 st.success(f"✅ Successfully updated {updated_count} field(s)")
                                 st.rerun()
@@ -924,7 +1707,7 @@ def main():
         st.markdown('</div>', unsafe_allow_html=True)
     
     # Tab 3: Analytics (New Tab)
-    with tab3:
+    with tab3, span('tab: analytics'):
         if 'chart_data' in locals() and chart_data and not chart_df.empty:
             # Split into two columns for charts
             col1, col2 = st.columns(2)
@@ -934,19 +1717,13 @@ def main():
                 st.subheader("Monthly Spending by Person")
                 
                 if 'monthly_by_person' in chart_data and not chart_data['monthly_by_person'].empty:
-                    # Sort months in chronological order
-                    month_order = sorted(chart_data['monthly_by_person']['Month'].unique())
-                    
-                    monthly_chart = alt.Chart(chart_data['monthly_by_person']).mark_bar().encode(
-                        x=alt.X('Month:N', title='Month', sort=month_order),
-                        y=alt.Y('Amount:Q', title='Amount ($)'),
-                        color=alt.Color('Name:N', title='Person'),
-                        tooltip=['Month', 'Name', alt.Tooltip('Amount:Q', format='$.2f')]
-                    ).properties(
-                        title='Monthly Spending Comparison'
+                    # Long histories are re-bucketed to quarters or years before charting
+                    resolution = choose_time_resolution(chart_data['monthly_by_person']['Month'].unique())
+                    render_cached_chart(
+                        'monthly_comparison', view_version,
+                        lambda: build_monthly_comparison_chart(chart_data['monthly_by_person'], resolution),
+                        resolution=resolution
                     )
-                    
-                    st.altair_chart(monthly_chart, use_container_width=True)
                 else:
                     st.info("Not enough data for this chart")
                 st.markdown('</div>', unsafe_allow_html=True)
@@ -956,18 +1733,11 @@ def main():
                 
                 if 'restaurant_amount' in chart_data and not chart_data['restaurant_amount'].empty:
                     # Limit to top 5 restaurants
-                    top_restaurants_amount = chart_data['restaurant_amount'].head(5)
-                    
-                    restaurant_chart = alt.Chart(top_restaurants_amount).mark_bar().encode(
-                        x=alt.X('Amount:Q', title='Total Spent ($)'),
-                        y=alt.Y('Restaurant:N', title='Restaurant', sort='-x'),
-                        color=alt.Color('Amount:Q', scale=alt.Scale(scheme='greens')),
-                        tooltip=['Restaurant', alt.Tooltip('Amount:Q', format='$.2f')]
-                    ).properties(
-                        title='Top 5 Restaurants by Spending'
+                    render_cached_chart(
+                        'top_spending', view_version,
+                        lambda: build_top_spending_chart(chart_data['restaurant_amount'], limit=5),
+                        limit=5
                     )
-                    
-                    st.altair_chart(restaurant_chart, use_container_width=True)
                 else:
                     st.info("Not enough data for this chart")
                 st.markdown('</div>', unsafe_allow_html=True)
@@ -975,35 +1745,19 @@ def main():
             with col2:
                 st.markdown('<div class="card">', unsafe_allow_html=True)
                 st.subheader("Summary Table")
+                st.caption(f"Amounts in {get_fx_rates().reporting}")
                 
                 if not summary_table.empty:
-                    # Create formatters for different columns
-                    formatters = {
-                        'Katy': '${:,.2f}',
-                        'Sebastien': '${:,.2f}',
-                        'Monthly Difference': '${:,.2f}',
-                        'Running Balance': '${:,.2f}',
-                        'Katy (Count)': '{:.0f}',
-                        'Sebastien (Count)': '{:.0f}',
-                        'Count Difference': '{:.0f}'
-                    }
-                    
-                    # Apply conditional formatting - fixed to work with pandas styling
-                    def highlight_amount_diff(s):
-                        return ['background-color: #e6ffe6; color: #006600' if v > 0 
-                                else 'background-color: #ffe6e6; color: #990000' if v < 0
-                                else '' for v in s]
-                    
-                    def highlight_count_diff(s):
-                        return ['background-color: #e6ffe6; color: #006600' if v > 0 
-                                else 'background-color: #ffe6e6; color: #990000' if v < 0
-                                else '' for v in s]
-                    
-                    styled_table = summary_table.style.format(formatters)\
-                        .apply(highlight_amount_diff, subset=['Monthly Difference', 'Running Balance'])\
-                        .apply(highlight_count_diff, subset=['Count Difference'])
-                    
-                    st.dataframe(styled_table, use_container_width=True, height=400)
+                    # Formatting and highlighting are computed once per data version
+                    with span('summary_table'):
+                        summary_view, summary_config = build_summary_presentation(view_version, summary_table)
+                        PROFILER.record_frame('summary_presentation', summary_view)
+                        st.dataframe(
+                            summary_view,
+                            column_config=summary_config,
+                            use_container_width=True,
+                            height=400
+                        )
                 else:
                     st.info("No data available yet.")
                 st.markdown('</div>', unsafe_allow_html=True)
@@ -1014,42 +1768,37 @@ def main():
                 
                 # Create a donut chart for visit distribution by person
                 visit_data = pd.DataFrame({
-                    'Person': ['Katy', 'Sebastien'],
+                    'Person': participants,
                     'Visits': [
-                        summary_table.loc['Total', 'Katy (Count)'] if not summary_table.empty else 0,
-                        summary_table.loc['Total', 'Sebastien (Count)'] if not summary_table.empty else 0
+                        summary_table.loc['Total', count_column(name)] if not summary_table.empty else 0
+                        for name in participants
                     ]
                 })
                 
                 if not visit_data.empty and sum(visit_data['Visits']) > 0:
-                    # Calculate percentage
-                    total_visits = sum(visit_data['Visits'])
-                    visit_data['Percentage'] = visit_data['Visits'] / total_visits
-                    
-                    # Create the chart
-                    visit_chart = alt.Chart(visit_data).mark_arc(innerRadius=50).encode(
-                        theta=alt.Theta(field="Visits", type="quantitative"),
-                        color=alt.Color(field="Person", type="nominal", scale=alt.Scale(range=['#FF9AA2', '#86C7F3'])),
-                        tooltip=['Person', 'Visits', alt.Tooltip('Percentage:Q', format='.1%')]
-                    ).properties(
-                        title='Restaurant Visits by Person',
-                        width=300,
-                        height=300
+                    render_cached_chart(
+                        'visit_donut', view_version,
+                        lambda: build_visit_donut_chart(visit_data)
                     )
-                    
-                    # Add text in the center
-                    text = alt.Chart(pd.DataFrame({'text': [f'Total: {int(total_visits)}']})).mark_text(
-                        fontSize=20,
-                        font='Arial',
-                        align='center'
-                    ).encode(
-                        text='text:N'
-                    )
-                    
-                    st.altair_chart(visit_chart + text, use_container_width=True)
                 else:
                     st.info("Not enough data for this chart")
                 st.markdown('</div>', unsafe_allow_html=True)
+            
+            # Monthly spending limits
+            with st.expander("🎯 Monthly budgets"):
+                render_budget_editor(participants)
+            
+            # Who carries what share, from which date
+            with st.expander("⚖️ Split ratios"):
+                render_split_schedule(participants)
+            
+            # Balance and summary as they stood at an earlier time
+            with st.expander("🕰️ Look back in time"):
+                render_time_travel()
+            
+            # Fold different spellings of the same restaurant together
+            with st.expander("🔧 Merge restaurant names"):
+                render_alias_admin(view_version, chart_data['restaurant_count']['Restaurant'].tolist())
         
         else:
             st.info("No data available for analytics. Please add some expenses first.")
@@ -0,0 +1,157 @@
+"""Benchmark the ledger data pipeline against synthetic ledgers.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pipeline --sizes 1000 10000 100000 1000000
+
+Each stage is timed (best of ``--repeat`` runs) and profiled once with
+tracemalloc for peak memory. The scaling exponent is the log-log slope of
+wall time between consecutive sizes (1.0 means linear).
+"""
+import argparse
+import gc
+import json
+import math
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.synthetic import generate_ledger
+from ledger import (
+    calculate_balance,
+    create_summary_table,
+    detect_changes,
+    filter_transactions,
+    prepare_chart_data,
+)
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def transactions_frame(sheet_data):
+    """Build the View/Edit tab's DataFrame the same way main() does"""
+    df = pd.DataFrame(sheet_data[1:], columns=sheet_data[0])
+    df[sheet_data[0][0]] = pd.to_datetime(df[sheet_data[0][0]])
+    df['Month'] = df[sheet_data[0][0]].dt.strftime('%Y-%m')
+    return df
+
+
+def edited_copy(df, header, edits=10):
+    """Simulate the data editor returning a frame with a few modified amounts"""
+    edited = df.copy()
+    edited['Select'] = False
+    positions = edited.index[:: max(len(edited) // edits, 1)][:edits]
+    edited.loc[positions, header[3]] = '999.99'
+    return edited
+
+
+def stages(sheet_data):
+    """Return (name, callable) pairs; later stages reuse earlier outputs"""
+    header = sheet_data[0]
+    summary_table, chart_df = create_summary_table(sheet_data)
+    df = transactions_frame(sheet_data)
+    month = df['Month'].iloc[len(df) // 2]
+    edited = edited_copy(df, header)
+
+    return [
+        ('create_summary_table', lambda: create_summary_table(sheet_data)),
+        ('prepare_chart_data', lambda: prepare_chart_data(chart_df)),
+        ('calculate_balance', lambda: calculate_balance(summary_table)),
+        ('filter_transactions', lambda: filter_transactions(df, header, 'pho', 'Katy', month)),
+        ('detect_changes', lambda: detect_changes(df, edited, header)),
+    ]
+
+
+def time_stage(func, repeat):
+    best = math.inf
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_memory(func):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def run(sizes, repeat=3, seed=0, quadratic_limit=20_000):
+    results = []
+    for size in sizes:
+        sheet_data = generate_ledger(size, seed=seed)
+        for name, func in stages(sheet_data):
+            if name == 'detect_changes' and size > quadratic_limit:
+                # The change-detection loop scans the whole frame per edited row
+                continue
+            results.append({
+                'stage': name,
+                'rows': size,
+                'seconds': time_stage(func, repeat),
+                'peak_bytes': peak_memory(func),
+            })
+        del sheet_data
+    return results
+
+
+def scaling_exponents(results):
+    """Log-log slope of time between consecutive sizes, per stage"""
+    by_stage = {}
+    for result in results:
+        by_stage.setdefault(result['stage'], []).append(result)
+
+    exponents = {}
+    for stage, points in by_stage.items():
+        slopes = []
+        for previous, current in zip(points, points[1:]):
+            if previous['seconds'] > 0 and current['seconds'] > 0:
+                slopes.append(
+                    math.log(current['seconds'] / previous['seconds'])
+                    / math.log(current['rows'] / previous['rows'])
+                )
+        exponents[stage] = slopes
+    return exponents
+
+
+def print_report(results):
+    print(f"{'stage':<22}{'rows':>12}{'wall ms':>12}{'peak MiB':>12}")
+    for result in results:
+        print(
+            f"{result['stage']:<22}{result['rows']:>12,}"
+            f"{result['seconds'] * 1000:>12.2f}{result['peak_bytes'] / 2**20:>12.2f}"
+        )
+    print()
+    print("Scaling exponents (log-log slope between consecutive sizes):")
+    for stage, slopes in scaling_exponents(results).items():
+        print(f"  {stage:<22}" + "  ".join(f"{slope:.2f}" for slope in slopes))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='ledger sizes to benchmark (up to 10000000)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--quadratic-limit', type=int, default=20_000,
+                        help='largest size for the quadratic change-detection loop')
+    parser.add_argument('--json', metavar='PATH', help='also write raw results as JSON')
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, repeat=args.repeat, seed=args.seed,
+                  quadratic_limit=args.quadratic_limit)
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
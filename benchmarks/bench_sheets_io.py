@@ -0,0 +1,78 @@
+"""Benchmark the ledger's Google Sheets helpers against the local emulator.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_sheets_io --rows 10000 --latency-ms 50 --iterations 20
+
+The emulator runs in-process, so results are reproducible and need no
+network access or credentials.
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks.sheets_emulator import EmulatorConfig, SheetsEmulator
+from benchmarks.synthetic import generate_ledger
+from ledger.sheets import (
+    connect_local,
+    delete_row,
+    fetch_sheet_data,
+    get_sheet_id,
+    update_cell,
+    update_sheet,
+)
+
+
+def operations(service):
+    return [
+        ('values.get (fetch_sheet_data)', lambda: fetch_sheet_data(service)),
+        ('values.append (update_sheet)', lambda: update_sheet(service, ['2025-01-01', 'Katy', 'Bench Bistro', '12.50'])),
+        ('values.update (update_cell)', lambda: update_cell(service, 2, 3, '42.0')),
+        ('spreadsheets.get (get_sheet_id)', lambda: get_sheet_id(service)),
+        ('batchUpdate (delete_row)', lambda: delete_row(service, 2)),
+    ]
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--quota-error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    config = EmulatorConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        quota_error_rate=args.quota_error_rate,
+        seed=args.seed,
+    )
+    with SheetsEmulator(generate_ledger(args.rows, seed=args.seed), config) as emulator:
+        service = connect_local(emulator.url)
+
+        print(f"{'operation':<34}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}")
+        for name, operation in operations(service):
+            samples = []
+            errors = 0
+            for _ in range(args.iterations):
+                start = time.perf_counter()
+                try:
+                    operation()
+                except Exception:
+                    errors += 1
+                samples.append(time.perf_counter() - start)
+            print(
+                f"{name:<34}{statistics.median(samples) * 1000:>10.2f}"
+                f"{percentile(samples, 0.95) * 1000:>10.2f}{errors:>8}"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""Compare the data processing of every app generation on the same ledgers.
+
+The repository keeps each generation of the app (app_v0.py ... app_v4.py and
+the current app.py). This benchmark loads each one, runs its own
+``create_summary_table`` and, where the version has them,
+``prepare_chart_data`` and ``calculate_balance`` against identical
+synthetic ledgers, and prints time and peak memory per version.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_versions --sizes 10000 100000
+
+With ``--gate`` the run fails (exit status 1) when a version is slower
+than ``--baseline`` by more than ``--max-regression`` on any stage, so a
+new version can be checked before it replaces app.py.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import sys
+
+from benchmarks.bench_pipeline import peak_memory, time_stage
+from benchmarks.synthetic import generate_ledger
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VERSIONS = ['app_v0', 'app_v1', 'app_v2', 'app_v3', 'app_v4', 'app']
+
+
+def load_version(name):
+    """Import ``<name>.py`` from the repository root under its own module name"""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, f'{name}.py'))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def version_stages(module, sheet_data):
+    """(stage, callable) pairs for the functions this version provides"""
+    result = module.create_summary_table(sheet_data)
+    stages = [('create_summary_table', lambda: module.create_summary_table(sheet_data))]
+
+    # app_v0/app_v1 return only the summary; later versions also return chart_df
+    summary_table, chart_df = result if isinstance(result, tuple) else (result, None)
+    if chart_df is not None and hasattr(module, 'prepare_chart_data'):
+        stages.append(('prepare_chart_data', lambda: module.prepare_chart_data(chart_df)))
+    if hasattr(module, 'calculate_balance'):
+        stages.append(('calculate_balance', lambda: module.calculate_balance(summary_table)))
+    return stages
+
+
+def run(versions, sizes, repeat=3, seed=0):
+    results = []
+    ledgers = {size: generate_ledger(size, seed=seed) for size in sizes}
+    for name in versions:
+        module = load_version(name)
+        for size, sheet_data in ledgers.items():
+            for stage, func in version_stages(module, sheet_data):
+                results.append({
+                    'version': name,
+                    'rows': size,
+                    'stage': stage,
+                    'seconds': time_stage(func, repeat),
+                    'peak_bytes': peak_memory(func),
+                })
+    return results
+
+
+def regressions(results, baseline, max_regression):
+    """Stages where a version is slower than the baseline by more than the allowed ratio"""
+    reference = {
+        (result['rows'], result['stage']): result['seconds']
+        for result in results if result['version'] == baseline
+    }
+    failures = []
+    for result in results:
+        base = reference.get((result['rows'], result['stage']))
+        if result['version'] != baseline and base and result['seconds'] > base * max_regression:
+            failures.append((result, result['seconds'] / base))
+    return failures
+
+
+def print_report(results, baseline):
+    reference = {
+        (result['rows'], result['stage']): result['seconds']
+        for result in results if result['version'] == baseline
+    }
+    print(f"{'version':<9}{'rows':>10}  {'stage':<22}{'wall ms':>11}{'peak MiB':>10}{f'vs {baseline}':>12}")
+    for result in sorted(results, key=lambda r: (r['rows'], r['stage'], VERSIONS.index(r['version']))):
+        base = reference.get((result['rows'], result['stage']))
+        ratio = f"{result['seconds'] / base:.2f}x" if base else '-'
+        print(
+            f"{result['version']:<9}{result['rows']:>10,}  {result['stage']:<22}"
+            f"{result['seconds'] * 1000:>11.2f}{result['peak_bytes'] / 2**20:>10.2f}{ratio:>12}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--versions', nargs='+', default=VERSIONS, choices=VERSIONS)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', default='app_v4', choices=VERSIONS)
+    parser.add_argument('--max-regression', type=float, default=1.25,
+                        help='allowed slowdown ratio against the baseline when gating')
+    parser.add_argument('--gate', action='store_true', help='exit with status 1 on a regression')
+    parser.add_argument('--json', metavar='PATH', help='also write raw results as JSON')
+    args = parser.parse_args(argv)
+
+    versions = list(dict.fromkeys([args.baseline] + args.versions))
+    results = run(versions, args.sizes, repeat=args.repeat, seed=args.seed)
+    print_report(results, args.baseline)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    failures = regressions(results, args.baseline, args.max_regression)
+    if failures:
+        print(f"\nSlower than {args.baseline} by more than {args.max_regression:.2f}x:")
+        for result, ratio in failures:
+            print(f"  {result['version']} {result['stage']} @ {result['rows']:,} rows: {ratio:.2f}x")
+        if args.gate:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
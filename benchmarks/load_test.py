@@ -0,0 +1,201 @@
+"""Headless load test simulating many concurrent Streamlit sessions.
+
+Each simulated user is a ``streamlit.testing.v1.AppTest`` session running
+app.py in this process, the way the Streamlit server runs one script
+thread per browser tab. All sessions talk to an in-process Sheets emulator.
+
+Run from the repository root:
+
+    python -m benchmarks.load_test --sessions 1 5 10 20 --actions 20 --rows 5000 --latency-ms 50
+
+Actions are drawn from a weighted mix:
+
+* ``add``       - fill in the Add Expense form and submit (includes the app's 2 s pause)
+* ``filter``    - change the View/Edit search and person filters
+* ``edit``      - change an amount in the sheet, then rerun to pick it up
+  (AppTest cannot drive st.data_editor, so the write goes through update_cell)
+* ``analytics`` - plain rerun, which renders the Analytics tab
+
+Per-action latency percentiles, throughput and process RSS are reported
+for every concurrency level.
+"""
+import argparse
+import os
+import random
+import resource
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.sheets_emulator import EmulatorConfig, SheetsEmulator
+from benchmarks.synthetic import generate_ledger
+from ledger.sheets import connect_local, update_cell
+
+# Environment variable app.py reads to find a local Sheets stand-in
+SHEETS_ENDPOINT_ENV = 'SHEETS_API_ENDPOINT'
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+DEFAULT_MIX = 'add=1,filter=4,edit=1,analytics=4'
+
+# httplib2 connections are not thread-safe, so the shared edit client is serialized
+_SERVICE_LOCK = threading.Lock()
+
+
+def current_rss_bytes():
+    """Resident set size of this process (Linux), falling back to the peak RSS"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class RssSampler(threading.Thread):
+    """Samples RSS in the background and keeps the maximum"""
+
+    def __init__(self, interval=0.2):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = current_rss_bytes()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.peak = max(self.peak, current_rss_bytes())
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def add(self, action, seconds, failed):
+        with self._lock:
+            self.samples.setdefault(action, []).append(seconds)
+            if failed:
+                self.errors[action] = self.errors.get(action, 0) + 1
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def simulate_session(session_id, actions, mix, recorder, service, timeout, seed):
+    rng = random.Random(seed + session_id)
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+
+    def timed(action, step):
+        start = time.perf_counter()
+        failed = False
+        try:
+            step()
+            failed = bool(at.exception)
+        except Exception:
+            failed = True
+        recorder.add(action, time.perf_counter() - start, failed)
+
+    def add():
+        at.text_input(key='tab1_custom_name').input(f'Load user {session_id}')
+        at.text_input(key='tab1_custom_restaurant').input(rng.choice(['Miss Pho', 'Ramen Bar', 'Load Bistro']))
+        at.number_input(key='tab1_amount').set_value(round(rng.uniform(8, 120), 2))
+        at.button(key='add_expense').click()
+        at.run()
+
+    def filter_view():
+        at.text_input(key='tab2_search').input(rng.choice(['', 'pho', 'ramen', 'grill']))
+        at.selectbox(key='tab2_name_filter').select(rng.choice(['All', 'Katy', 'Sebastien']))
+        at.run()
+
+    def edit():
+        with _SERVICE_LOCK:
+            update_cell(service, rng.randint(2, 50), 3, f'{rng.uniform(8, 120):.2f}')
+        at.run()
+
+    steps = {'add': add, 'filter': filter_view, 'edit': edit, 'analytics': at.run}
+    names = list(mix)
+    weights = [mix[name] for name in names]
+
+    timed('initial load', at.run)
+    for _ in range(actions):
+        action = rng.choices(names, weights)[0]
+        timed(action, steps[action])
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def run_level(sessions, args, mix, service):
+    recorder = Recorder()
+    sampler = RssSampler()
+    sampler.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        futures = [
+            pool.submit(simulate_session, i, args.actions, mix, recorder, service, args.timeout, args.seed)
+            for i in range(sessions)
+        ]
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - start
+    sampler.stop()
+
+    total = sum(len(samples) for samples in recorder.samples.values())
+    print(f"\n== {sessions} concurrent session(s): {total} actions in {elapsed:.1f} s "
+          f"({total / elapsed:.2f} actions/s), peak RSS {sampler.peak / 2**20:.0f} MiB, "
+          f"final RSS {current_rss_bytes() / 2**20:.0f} MiB")
+    print(f"{'action':<14}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}{'errors':>8}")
+    for action, samples in sorted(recorder.samples.items()):
+        print(
+            f"{action:<14}{len(samples):>7}"
+            f"{percentile(samples, 0.50) * 1000:>10.0f}{percentile(samples, 0.95) * 1000:>10.0f}"
+            f"{percentile(samples, 0.99) * 1000:>10.0f}{statistics.fmean(samples) * 1000:>10.0f}"
+            f"{recorder.errors.get(action, 0):>8}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 5, 10])
+    parser.add_argument('--actions', type=int, default=20, help='actions per session')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'weighted action mix (default {DEFAULT_MIX})')
+    parser.add_argument('--rows', type=int, default=5_000)
+    parser.add_argument('--latency-ms', type=float, default=50.0)
+    parser.add_argument('--jitter-ms', type=float, default=10.0)
+    parser.add_argument('--quota-error-rate', type=float, default=0.0)
+    parser.add_argument('--timeout', type=float, default=60.0, help='per-run AppTest timeout in seconds')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    config = EmulatorConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        quota_error_rate=args.quota_error_rate,
+        seed=args.seed,
+    )
+    with SheetsEmulator(generate_ledger(args.rows, seed=args.seed), config) as emulator:
+        os.environ[SHEETS_ENDPOINT_ENV] = emulator.url
+        service = connect_local(emulator.url)
+        for sessions in args.sessions:
+            run_level(sessions, args, mix, service)
+
+
+if __name__ == '__main__':
+    main()
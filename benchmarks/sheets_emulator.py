@@ -0,0 +1,391 @@
+"""Local stand-in for the Google Sheets v4 endpoints used by app.py.
+
+Serves ``values.get``, ``values.append``, ``values.update``,
+``spreadsheets.get`` and ``spreadsheets.batchUpdate`` (``deleteDimension``,
+``insertDimension`` and ``updateCells``) over HTTP so the app and the
+benchmarks can run without network access.
+Latency and quota errors (HTTP 429 / RESOURCE_EXHAUSTED) are simulated.
+
+Start it from the repository root and point the app at it:
+
+    python -m benchmarks.sheets_emulator --port 8765 --rows 10000 --latency-ms 80
+    SHEETS_API_ENDPOINT=http://127.0.0.1:8765/ streamlit run app.py
+
+or use ``SheetsEmulator`` in-process as a context manager.
+"""
+import argparse
+import collections
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+from benchmarks.synthetic import HEADER, generate_ledger
+
+_VALUES_PATH = re.compile(r'^/v4/spreadsheets/([^/]+)/values/([^/]+)$')
+_BATCH_UPDATE_PATH = re.compile(r'^/v4/spreadsheets/([^/]+):batchUpdate$')
+_SPREADSHEET_PATH = re.compile(r'^/v4/spreadsheets/([^/:]+)$')
+_A1_CELL = re.compile(r'^([A-Z]*)(\d*)$')
+
+
+@dataclass
+class EmulatorConfig:
+    """Knobs for simulated network behaviour"""
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    quota_error_rate: float = 0.0
+    requests_per_minute: int = 0  # 0 disables the sliding-window quota
+    seed: int = 0
+
+
+class QuotaExceeded(Exception):
+    pass
+
+
+def _column_number(letters):
+    number = 0
+    for letter in letters:
+        number = number * 26 + (ord(letter) - 64)
+    return number
+
+
+def column_letters(number):
+    """1 -> 'A', 27 -> 'AA'"""
+    letters = ''
+    while number:
+        number, remainder = divmod(number - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def parse_a1(a1_range):
+    """Split 'Sheet1!A2:D10' into (sheet, first_col, first_row, last_col, last_row).
+
+    Columns and rows are 1-based; open bounds are None.
+    """
+    sheet, _, cells = a1_range.rpartition('!')
+    start, _, end = cells.partition(':')
+    start_col, start_row = _A1_CELL.match(start.upper()).groups()
+    if end:
+        end_col, end_row = _A1_CELL.match(end.upper()).groups()
+    else:
+        end_col, end_row = start_col, start_row
+    return (
+        sheet.strip("'") or 'Sheet1',
+        _column_number(start_col) if start_col else 1,
+        int(start_row) if start_row else 1,
+        _column_number(end_col) if end_col else None,
+        int(end_row) if end_row else None,
+    )
+
+
+def _formatted(value):
+    """Cell text for an ExtendedValue, as values.get would return it"""
+    if 'numberValue' in value:
+        number = float(value['numberValue'])
+        return str(int(number)) if number.is_integer() else str(number)
+    if 'boolValue' in value:
+        return 'TRUE' if value['boolValue'] else 'FALSE'
+    return str(value.get('stringValue', value.get('formulaValue', '')))
+
+
+class SpreadsheetState:
+    """In-memory grid for a single-sheet spreadsheet"""
+
+    def __init__(self, values=None, title='Sheet1', sheet_id=0):
+        self.title = title
+        self.sheet_id = sheet_id
+        self.rows = [list(row) for row in (values or [HEADER])]
+        self.lock = threading.Lock()
+
+    def _trimmed(self):
+        last = len(self.rows)
+        while last and not any(self.rows[last - 1]):
+            last -= 1
+        return self.rows[:last]
+
+    def get(self, a1_range):
+        _, first_col, first_row, last_col, last_row = parse_a1(a1_range)
+        with self.lock:
+            rows = self._trimmed()
+            selected = rows[first_row - 1:last_row]
+            values = []
+            for row in selected:
+                cells = row[first_col - 1:last_col]
+                while cells and cells[-1] in ('', None):
+                    cells.pop()
+                values.append(cells)
+        while values and not values[-1]:
+            values.pop()
+        result = {'range': a1_range, 'majorDimension': 'ROWS'}
+        if values:
+            result['values'] = values
+        return result
+
+    def append(self, a1_range, values):
+        _, first_col, _, _, _ = parse_a1(a1_range)
+        with self.lock:
+            self.rows = self._trimmed()
+            start_row = len(self.rows) + 1
+            for row in values:
+                self.rows.append([''] * (first_col - 1) + [str(value) for value in row])
+        width = max((len(row) for row in values), default=0)
+        updated_range = (
+            f"{self.title}!{column_letters(first_col)}{start_row}:"
+            f"{column_letters(first_col + max(width, 1) - 1)}{start_row + len(values) - 1}"
+        )
+        return {
+            'tableRange': a1_range,
+            'updates': {
+                'updatedRange': updated_range,
+                'updatedRows': len(values),
+                'updatedColumns': width,
+                'updatedCells': sum(len(row) for row in values),
+            },
+        }
+
+    def update(self, a1_range, values):
+        _, first_col, first_row, _, _ = parse_a1(a1_range)
+        with self.lock:
+            for offset, row in enumerate(values):
+                index = first_row - 1 + offset
+                while len(self.rows) <= index:
+                    self.rows.append([])
+                target = self.rows[index]
+                needed = first_col - 1 + len(row)
+                if len(target) < needed:
+                    target.extend([''] * (needed - len(target)))
+                target[first_col - 1:needed] = [str(value) for value in row]
+        return {
+            'updatedRange': a1_range,
+            'updatedRows': len(values),
+            'updatedColumns': max((len(row) for row in values), default=0),
+            'updatedCells': sum(len(row) for row in values),
+        }
+
+    def metadata(self, spreadsheet_id):
+        return {
+            'spreadsheetId': spreadsheet_id,
+            'sheets': [{'properties': {'sheetId': self.sheet_id, 'title': self.title, 'index': 0}}],
+        }
+
+    def _update_cells(self, update):
+        start = update['start']
+        first_row, first_col = start.get('rowIndex', 0), start.get('columnIndex', 0)
+        for offset, row in enumerate(update.get('rows', [])):
+            index = first_row + offset
+            while len(self.rows) <= index:
+                self.rows.append([])
+            target = self.rows[index]
+            cells = [_formatted(cell.get('userEnteredValue', {})) for cell in row.get('values', [])]
+            needed = first_col + len(cells)
+            if len(target) < needed:
+                target.extend([''] * (needed - len(target)))
+            target[first_col:needed] = cells
+
+    def batch_update(self, requests):
+        """Apply every request or, like the real API, none of them"""
+        replies = []
+        with self.lock:
+            snapshot = [list(row) for row in self.rows]
+            try:
+                self._apply(requests, replies)
+            except Exception:
+                self.rows = snapshot
+                raise
+        return {'replies': replies}
+
+    def _apply(self, requests, replies):
+        for request in requests:
+            if 'deleteDimension' in request:
+                dimension_range = request['deleteDimension']['range']
+                if dimension_range.get('dimension') != 'ROWS':
+                    raise ValueError('Only ROWS deletion is emulated')
+                del self.rows[dimension_range['startIndex']:dimension_range['endIndex']]
+                replies.append({})
+            elif 'insertDimension' in request:
+                dimension_range = request['insertDimension']['range']
+                if dimension_range.get('dimension') != 'ROWS':
+                    raise ValueError('Only ROWS insertion is emulated')
+                start, end = dimension_range['startIndex'], dimension_range['endIndex']
+                if start > len(self.rows):
+                    raise ValueError(f'startIndex {start} is beyond the last row')
+                self.rows[start:start] = [[] for _ in range(end - start)]
+                replies.append({})
+            elif 'updateCells' in request:
+                self._update_cells(request['updateCells'])
+                replies.append({})
+            else:
+                raise ValueError(f'Unsupported request: {sorted(request)}')
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = 'SheetsEmulator/1.0'
+
+    def log_message(self, format, *args):  # noqa: A002 - matches the base signature
+        pass
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, message, reason):
+        self._send(status, {'error': {'code': status, 'message': message, 'status': reason}})
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def _dispatch(self, method):
+        emulator = self.server.emulator
+        path = urlsplit(self.path).path
+        try:
+            emulator.before_request()
+            state = emulator.state
+
+            match = _VALUES_PATH.match(path)
+            if match:
+                spreadsheet_id, raw_range = match.groups()
+                if method == 'POST' and raw_range.endswith(':append'):
+                    a1_range = unquote(raw_range[:-len(':append')])
+                    result = state.append(a1_range, self._body().get('values', []))
+                    result['spreadsheetId'] = spreadsheet_id
+                    return self._send(200, result)
+                if method == 'GET':
+                    return self._send(200, state.get(unquote(raw_range)))
+                if method == 'PUT':
+                    result = state.update(unquote(raw_range), self._body().get('values', []))
+                    result['spreadsheetId'] = spreadsheet_id
+                    return self._send(200, result)
+
+            match = _BATCH_UPDATE_PATH.match(path)
+            if match and method == 'POST':
+                result = state.batch_update(self._body().get('requests', []))
+                result['spreadsheetId'] = match.group(1)
+                return self._send(200, result)
+
+            match = _SPREADSHEET_PATH.match(path)
+            if match and method == 'GET':
+                return self._send(200, state.metadata(match.group(1)))
+
+            return self._error(404, f'Not found: {method} {path}', 'NOT_FOUND')
+        except QuotaExceeded as e:
+            return self._error(429, str(e), 'RESOURCE_EXHAUSTED')
+        except (ValueError, KeyError, AttributeError) as e:
+            return self._error(400, f'Invalid request: {e}', 'INVALID_ARGUMENT')
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PUT(self):
+        self._dispatch('PUT')
+
+
+class SheetsEmulator:
+    """Threaded HTTP server emulating the Sheets v4 API on localhost"""
+
+    def __init__(self, values=None, config=None, host='127.0.0.1', port=0):
+        self.state = SpreadsheetState(values)
+        self.config = config or EmulatorConfig()
+        self._random = random.Random(self.config.seed)
+        self._random_lock = threading.Lock()
+        self._window = collections.deque()
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.emulator = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def before_request(self):
+        """Apply simulated latency and quota limits"""
+        config = self.config
+        with self._random_lock:
+            delay = config.latency_ms + self._random.uniform(-config.jitter_ms, config.jitter_ms)
+            failed = self._random.random() < config.quota_error_rate
+            if config.requests_per_minute:
+                now = time.monotonic()
+                while self._window and now - self._window[0] > 60:
+                    self._window.popleft()
+                if len(self._window) >= config.requests_per_minute:
+                    failed = True
+                else:
+                    self._window.append(now)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        if failed:
+            raise QuotaExceeded(
+                "Quota exceeded for quota metric 'Requests' and limit "
+                "'Requests per minute per user' of service 'sheets.googleapis.com'"
+            )
+
+    def serve_forever(self):
+        """Serve in the calling thread until interrupted"""
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def start(self):
+        """Serve from a background thread"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Local Google Sheets v4 stand-in')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--rows', type=int, default=1000, help='synthetic expense rows to preload')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--quota-error-rate', type=float, default=0.0,
+                        help='probability of answering 429 RESOURCE_EXHAUSTED')
+    parser.add_argument('--requests-per-minute', type=int, default=0,
+                        help='sliding-window request quota (0 = unlimited)')
+    args = parser.parse_args(argv)
+
+    config = EmulatorConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        quota_error_rate=args.quota_error_rate,
+        requests_per_minute=args.requests_per_minute,
+        seed=args.seed,
+    )
+    emulator = SheetsEmulator(generate_ledger(args.rows, seed=args.seed), config, args.host, args.port)
+    print(f'Sheets emulator listening on {emulator.url} with {args.rows} rows')
+    print(f'Point the app at it with SHEETS_API_ENDPOINT={emulator.url}')
+    try:
+        emulator.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Seeded synthetic ledgers shaped like the expense sheet.
+
+The generated data mirrors what ``fetch_sheet_data`` returns: a header row
+followed by ``[Date, Name, Restaurant, Amount]`` rows where every value is a
+string. Restaurant popularity follows a Zipf distribution so a handful of
+places dominate, like in the real sheet.
+"""
+import numpy as np
+
+HEADER = ['Date', 'Name', 'Restaurant', 'Amount']
+PEOPLE = ('Katy', 'Sebastien')
+
+_PREFIXES = [
+    'Miss', 'Golden', 'Little', 'Chez', 'Le Petit', 'Casa', 'Royal', 'Blue',
+    'Imperial', 'Old Town', 'Happy', 'Urban', 'La', 'Big', 'Lucky', 'Green',
+]
+_CUISINES = [
+    'Pho', 'Ramen', 'Sushi', 'Taco', 'Burger', 'Pizza', 'Curry', 'Bistro',
+    'Noodle', 'Grill', 'Dumpling', 'Brasserie', 'Cantina', 'Deli', 'Bagel',
+    'Poke', 'Shawarma', 'Trattoria',
+]
+_SUFFIXES = ['', ' House', ' Bar', ' Kitchen', ' Express', ' & Co']
+
+
+def restaurant_names(count, seed=0):
+    """Return ``count`` distinct, realistic-looking restaurant names"""
+    rng = np.random.default_rng(seed)
+    names = []
+    seen = set()
+    while len(names) < count:
+        name = (
+            f"{rng.choice(_PREFIXES)} {rng.choice(_CUISINES)}{rng.choice(_SUFFIXES)}"
+        )
+        if name in seen:
+            # Disambiguate like real chains do once the combinations run out
+            name = f"{name} #{len(names)}"
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def generate_ledger(rows, seed=0, people=PEOPLE, restaurants=200,
+                    zipf_exponent=1.1, start='2019-01-01', end='2025-12-31'):
+    """Generate ``rows`` expenses as sheet values (header included).
+
+    Dates are spread uniformly over ``[start, end]`` and sorted, amounts are
+    log-normal around $40 and rounded to cents.
+    """
+    rng = np.random.default_rng(seed)
+
+    names = np.array(restaurant_names(restaurants, seed=seed), dtype=object)
+    ranks = np.arange(1, restaurants + 1, dtype=float)
+    popularity = ranks ** -zipf_exponent
+    popularity /= popularity.sum()
+
+    start_day = np.datetime64(start, 'D')
+    span_days = (np.datetime64(end, 'D') - start_day).astype(int) + 1
+    days = np.sort(rng.integers(0, span_days, size=rows))
+    dates = np.datetime_as_string(start_day + days, unit='D')
+
+    payers = np.array(people, dtype=object)[rng.integers(0, len(people), size=rows)]
+    places = names[rng.choice(restaurants, size=rows, p=popularity)]
+    amounts = np.round(rng.lognormal(mean=np.log(40), sigma=0.5, size=rows), 2)
+    amount_text = np.char.mod('%.2f', amounts)
+
+    values = [HEADER]
+    values.extend(map(list, zip(dates.tolist(), payers.tolist(), places.tolist(), amount_text.tolist())))
+    return values
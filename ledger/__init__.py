@@ -0,0 +1,61 @@
+"""Streamlit-free core of the restaurant expense tracker.
+
+The ledger model, its aggregations and the Google Sheets storage helpers
+live here so that batch jobs, benchmarks and other front ends can use them
+without importing Streamlit. ``app.py`` is one consumer of this package.
+"""
+from ledger.aggregation import (
+    CHART_WIDTH_PX,
+    TIME_RESOLUTIONS,
+    calculate_balance,
+    choose_time_resolution,
+    create_summary_table,
+    detect_changes,
+    filter_transactions,
+    prepare_chart_data,
+    rebucket_monthly,
+    settlement,
+    summary_participants,
+)
+from ledger.model import (
+    COLUMNS,
+    PARTICIPANTS,
+    PARTICIPANTS_ENV,
+    SHARES_PATTERN,
+    compute_data_version,
+    count_column,
+    expense_row,
+    format_shares,
+    ledger_participants,
+    parse_shares,
+    shares_error,
+    unknown_payers,
+)
+from ledger.sheets import SheetsError
+
+__all__ = [
+    'CHART_WIDTH_PX',
+    'COLUMNS',
+    'PARTICIPANTS',
+    'PARTICIPANTS_ENV',
+    'SHARES_PATTERN',
+    'SheetsError',
+    'TIME_RESOLUTIONS',
+    'calculate_balance',
+    'choose_time_resolution',
+    'compute_data_version',
+    'count_column',
+    'create_summary_table',
+    'detect_changes',
+    'expense_row',
+    'filter_transactions',
+    'format_shares',
+    'ledger_participants',
+    'parse_shares',
+    'prepare_chart_data',
+    'rebucket_monthly',
+    'settlement',
+    'shares_error',
+    'summary_participants',
+    'unknown_payers',
+]
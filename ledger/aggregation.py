@@ -0,0 +1,240 @@
+"""Aggregations over the expense ledger: monthly summary, chart inputs and balances."""
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from ledger.canonical import canonicalize_restaurants
+from ledger.model import COLUMNS, count_column, ledger_participants
+from ledger.settlement import net_positions, settle
+
+def create_summary_table(data, participants=None, rates=None):
+    """Monthly amount and meal count per participant, newest month first, with a Total row.
+
+    With exactly two participants the table also carries their monthly and
+    running difference; larger groups are settled with ``calculate_balance``.
+    Given ``ledger.fx.FxRates``, amounts are converted to the reporting
+    currency and the amount as entered is kept in ``Original Amount``.
+    """
+    if not data or len(data) < 2:
+        return pd.DataFrame(), pd.DataFrame()
+    
+    # Create DataFrame from sheet data; rows may stop before the optional columns
+    df = pd.DataFrame(data[1:])
+    df.columns = COLUMNS[:df.shape[1]]
+    df = df.reindex(columns=COLUMNS)
+    df[['Shares', 'Currency']] = df[['Shares', 'Currency']].fillna('')
+    
+    # Convert Amount to float
+    df['Amount'] = pd.to_numeric(df['Amount'], errors='coerce')
+    
+    # Convert Date to datetime
+    df['Date'] = pd.to_datetime(df['Date'])
+    
+    # Convert foreign-currency amounts at the rate of the expense's date
+    if rates is not None:
+        df['Original Amount'] = df['Amount']
+        df['Amount'] = rates.to_reporting(df['Amount'], df['Currency'], df['Date'])
+    
+    # Create Month-Year column
+    df['Month-Year'] = df['Date'].dt.strftime('%Y-%m')
+    
+    # Create pivot table for amounts
+    amount_pivot = pd.pivot_table(
+        df,
+        values='Amount',
+        index='Month-Year',
+        columns='Name',
+        aggfunc='sum',
+        fill_value=0
+    )
+    
+    # Create pivot table for count of entries
+    count_pivot = pd.pivot_table(
+        df,
+        values='Amount',
+        index='Month-Year',
+        columns='Name',
+        aggfunc='count',
+        fill_value=0
+    )
+    
+    if participants is None:
+        participants = ledger_participants(data)
+    
+    # Ensure every participant has a column in both pivots, in a stable order
+    amount_pivot = amount_pivot.reindex(columns=participants, fill_value=0)
+    count_pivot = count_pivot.reindex(columns=participants, fill_value=0)
+    count_pivot.columns = [count_column(name) for name in participants]
+    
+    # Combine amount and count pivots
+    final_table = pd.concat([amount_pivot, count_pivot], axis=1)
+    
+    # Calculate differences and running balance
+    if len(participants) == 2:
+        first, second = participants
+        final_table.insert(2, 'Monthly Difference', amount_pivot[first] - amount_pivot[second])
+        final_table.insert(3, 'Running Balance', final_table['Monthly Difference'].cumsum())
+        final_table['Count Difference'] = count_pivot[count_column(first)] - count_pivot[count_column(second)]
+    
+    # Sort by Month-Year
+    final_table = final_table.sort_index(ascending=False)
+    
+    # Add total row
+    total_row = final_table.sum()
+    if 'Running Balance' in final_table.columns:
+        total_row['Running Balance'] = final_table['Running Balance'].iloc[-1]
+    final_table.loc['Total'] = total_row
+    final_table.columns.name = None
+    
+    # For charts - create a copy of the dataframe without the Total row
+    chart_df = df.copy()
+    
+    return final_table, chart_df
+
+def prepare_chart_data(df, aliases=None):
+    """Prepare dataframes for various charts, grouping restaurants by canonical name"""
+    df = df.assign(Restaurant=canonicalize_restaurants(df['Restaurant'], aliases))
+    
+    # Monthly spending by person
+    monthly_by_person = df.copy()
+    monthly_by_person['Month'] = monthly_by_person['Date'].dt.strftime('%Y-%m')
+    monthly_by_person = monthly_by_person.groupby(['Month', 'Name'])['Amount'].sum().reset_index()
+    
+    # Restaurant frequency
+    restaurant_count = df.groupby('Restaurant').size().reset_index(name='Count')
+    restaurant_count = restaurant_count.sort_values('Count', ascending=False)
+    
+    # Spending by restaurant
+    restaurant_amount = df.groupby('Restaurant')['Amount'].sum().reset_index()
+    restaurant_amount = restaurant_amount.sort_values('Amount', ascending=False)
+    
+    # Recent trends (last 3 months)
+    three_months_ago = datetime.now() - timedelta(days=90)
+    recent_df = df[df['Date'] > pd.Timestamp(three_months_ago)]
+    
+    return {
+        'monthly_by_person': monthly_by_person,
+        'restaurant_count': restaurant_count,
+        'restaurant_amount': restaurant_amount,
+        'recent': recent_df
+    }
+
+# Time axis resolution for the monthly charts
+CHART_WIDTH_PX = 700
+MIN_BAR_WIDTH_PX = 25
+TIME_RESOLUTIONS = {
+    'month': {'label': 'Month', 'months': 1},
+    'quarter': {'label': 'Quarter', 'months': 3},
+    'year': {'label': 'Year', 'months': 12},
+}
+
+def choose_time_resolution(months, chart_width=CHART_WIDTH_PX):
+    """Pick the finest bucket that keeps one bar per period readable at the given width"""
+    if len(months) == 0:
+        return 'month'
+    periods = pd.PeriodIndex(months, freq='M')
+    span = periods.max().ordinal - periods.min().ordinal + 1
+    max_periods = max(chart_width // MIN_BAR_WIDTH_PX, 1)
+    
+    for resolution, info in TIME_RESOLUTIONS.items():
+        if -(-span // info['months']) <= max_periods:
+            return resolution
+    return 'year'
+
+def rebucket_monthly(monthly_by_person, resolution):
+    """Re-aggregate monthly totals per person into quarters or years"""
+    if resolution == 'month' or monthly_by_person.empty:
+        return monthly_by_person
+    
+    periods = pd.PeriodIndex(monthly_by_person['Month'], freq='M')
+    if resolution == 'quarter':
+        labels = periods.asfreq('Q').strftime('%Y-Q%q')
+    else:
+        labels = periods.year.astype(str)
+    
+    return (
+        monthly_by_person.assign(Month=labels)
+        .groupby(['Month', 'Name'], as_index=False)['Amount']
+        .sum()
+    )
+
+def summary_participants(summary_table):
+    """Participants in a summary table, in column order"""
+    counts = {column for column in summary_table.columns if column.endswith(' (Count)')}
+    return [column for column in summary_table.columns if count_column(column) in counts]
+
+def settlement(summary_table, weights=None):
+    """Transfers ``(debtor, creditor, amount)`` that settle the totals in a summary table.
+
+    ``weights`` are what each participant should carry (a Series by name,
+    e.g. from ``ledger.splits.owed_totals``); by default an equal split.
+    """
+    if 'Total' not in summary_table.index:
+        return []
+    paid = summary_table.loc['Total', summary_participants(summary_table)].astype(float)
+    if isinstance(weights, pd.Series):
+        weights = weights.reindex(paid.index).fillna(0).to_numpy()
+    return settle(net_positions(paid, weights))
+
+def calculate_balance(summary_table, weights=None):
+    """Calculate who owes who based on the summary table"""
+    participants = summary_participants(summary_table) if not summary_table.empty else []
+    if 'Total' in summary_table.index and participants:
+        transfers = settlement(summary_table, weights)
+        
+        if not transfers:  # Essentially even
+            return "Even", 0, "neutral"
+        elif len(participants) == 2:
+            debtor, creditor, amount = transfers[0]
+            # Positive when the first participant paid more than their share
+            balance_class = "positive" if creditor == participants[0] else "negative"
+            return f"{debtor} owes {creditor}", amount, balance_class
+        else:
+            total = sum(amount for _, _, amount in transfers)
+            return f"{len(transfers)} transfers to settle up", total, "neutral"
+    
+    return "Cannot calculate balance", 0, "neutral"
+
+def filter_transactions(df, header, search_term="", name_filter="All", month_filter="All"):
+    """Apply the View/Edit tab's restaurant search, person and month filters"""
+    filtered_df = df.copy()
+    
+    if search_term:
+        filtered_df = filtered_df[filtered_df[header[2]].str.contains(search_term, case=False)]
+    
+    if name_filter != "All":
+        filtered_df = filtered_df[filtered_df[header[1]] == name_filter]
+    
+    if month_filter != "All":
+        filtered_df = filtered_df[filtered_df['Month'] == month_filter]
+    
+    return filtered_df
+
+def _cell_text(value):
+    """Cell value as the sheet stores it; cleared editor cells come back as None"""
+    if value is None or (isinstance(value, float) and value != value):
+        return ''
+    return str(value)
+
+def detect_changes(df, edited_df, header):
+    """List the cells that differ between the data editor output and the original data"""
+    changes = []
+    
+    for idx, row in edited_df.iterrows():
+        # Find matching row in original df
+        orig_idx = df.index[df[header[0]] == row[header[0]]].tolist()
+        if orig_idx:
+            orig_row = df.iloc[orig_idx[0]]
+            
+            # Check each field for changes
+            for col in header[1:]:
+                if _cell_text(row[col]) != _cell_text(orig_row[col]):
+                    changes.append({
+                        'row': orig_idx[0],
+                        'col': col,
+                        'col_idx': header.index(col),
+                        'old_value': orig_row[col],
+                        'new_value': row[col] if _cell_text(row[col]) else ''
+                    })
+    
+    return changes
@@ -0,0 +1,129 @@
+"""Monthly budgets per person and for the household.
+
+Limits are stored as JSON, in the reporting currency::
+
+    {"household": 800, "people": {"Katy": 400, "Sebastien": 400}}
+
+``BudgetTracker`` holds month-to-date spending keyed by month and person.
+It is seeded from the monthly totals the summary table already computes,
+so nothing is re-aggregated, and ``record`` adds an appended expense with
+two dictionary updates. Checking a budget is a lookup either way.
+"""
+import json
+import math
+import os
+import threading
+from collections import defaultdict
+
+BUDGETS_FILE = 'budgets.json'
+# Share of a budget after which it is reported as nearly used up
+WARNING_FRACTION = 0.8
+
+
+class Budgets:
+    """Monthly limits, persisted as JSON"""
+
+    def __init__(self, household=None, people=None, path=None):
+        self.path = path
+        self.household = household
+        self.people = dict(people or {})
+
+    @classmethod
+    def load(cls, path=BUDGETS_FILE):
+        if not os.path.exists(path):
+            return cls(path=path)
+        with open(path, encoding='utf-8') as f:
+            limits = json.load(f)
+        return cls(limits.get('household'), limits.get('people'), path=path)
+
+    def save(self, path=None):
+        """Write atomically so a concurrent reader never sees a partial file"""
+        path = path or self.path
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'household': self.household, 'people': self.people}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def __bool__(self):
+        return bool(self.household or self.people)
+
+
+class BudgetStatus:
+    """Spending against one limit for one month"""
+
+    def __init__(self, label, limit, spent):
+        self.label = label
+        self.limit = limit
+        self.spent = spent
+
+    @property
+    def remaining(self):
+        return self.limit - self.spent
+
+    @property
+    def fraction(self):
+        return self.spent / self.limit if self.limit else 0.0
+
+    @property
+    def level(self):
+        if self.spent > self.limit:
+            return 'over'
+        if self.fraction >= WARNING_FRACTION:
+            return 'warning'
+        return 'ok'
+
+    def after(self, amount):
+        """Status if ``amount`` more were spent"""
+        return BudgetStatus(self.label, self.limit, self.spent + amount)
+
+
+class BudgetTracker:
+    """Month-to-date spending per person and for the household"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.version = None
+        self.by_person = defaultdict(float)
+        self.by_month = defaultdict(float)
+
+    def sync(self, version, summary_table, participants):
+        """Seed from a summary table (months as rows, one amount column per person)"""
+        with self._lock:
+            if version == self.version:
+                return False
+            self.by_person = defaultdict(float)
+            self.by_month = defaultdict(float)
+            if not summary_table.empty:
+                months = summary_table.drop(index='Total', errors='ignore')
+                amounts = months[participants].astype(float)
+                for (month, person), spent in amounts.stack().items():
+                    self.by_person[month, person] = spent
+                self.by_month.update(amounts.sum(axis=1).items())
+            self.version = version
+            return True
+
+    def record(self, month, person, amount):
+        """Add an appended expense; amounts that are not finite numbers are ignored"""
+        if not math.isfinite(amount):
+            return
+        with self._lock:
+            self.by_person[month, person] += amount
+            self.by_month[month] += amount
+
+    def status(self, budgets, month, person=None):
+        """BudgetStatus for ``person`` (if they have a limit) and the household, in that order"""
+        statuses = []
+        if person is not None and budgets.people.get(person):
+            statuses.append(BudgetStatus(person, budgets.people[person], self.by_person.get((month, person), 0.0)))
+        if budgets.household:
+            statuses.append(BudgetStatus('Household', budgets.household, self.by_month.get(month, 0.0)))
+        return statuses
+
+    def alerts(self, budgets, month):
+        """Budgets nearly used up or exceeded this month"""
+        statuses = [
+            BudgetStatus(person, limit, self.by_person.get((month, person), 0.0))
+            for person, limit in budgets.people.items() if limit
+        ]
+        statuses += self.status(budgets, month)
+        return [status for status in statuses if status.level != 'ok']
@@ -0,0 +1,169 @@
+"""Canonical restaurant names.
+
+Spellings such as "Miss Pho", "miss pho " and "Miss Phở" are folded to one
+key (accents stripped, casefolded, whitespace collapsed) and an alias table
+maps further keys onto a chosen canonical name. Normalization runs once
+per distinct spelling rather than once per expense, and the result is
+broadcast back with the factorized codes, so the chart aggregations group
+on the smaller set of canonical names.
+
+``TrigramIndex`` finds likely aliases ("Miss Pho" / "Mis Pho") for the
+merge view without comparing every pair of names.
+"""
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+import numpy as np
+import pandas as pd
+
+ALIASES_FILE = 'restaurant_aliases.json'
+
+
+def strip_marks(decomposed):
+    """Drop every combining mark from NFKD-decomposed text"""
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def normalize_name(name):
+    """Matching key for one name: accents stripped, casefolded, single spaces"""
+    stripped = strip_marks(unicodedata.normalize('NFKD', name))
+    return re.sub(r'\s+', ' ', stripped).strip().casefold()
+
+
+def normalize_names(names):
+    """Vectorized ``normalize_name`` over a Series of strings"""
+    return (
+        names.astype(str)
+        .str.normalize('NFKD')
+        .map(strip_marks)
+        .str.replace(r'\s+', ' ', regex=True)
+        .str.strip()
+        .str.casefold()
+    )
+
+
+class AliasTable:
+    """Alias key -> canonical name, persisted as a JSON object"""
+
+    def __init__(self, aliases=None, path=None):
+        self.path = path
+        self.aliases = {normalize_name(alias): name for alias, name in (aliases or {}).items()}
+
+    @classmethod
+    def load(cls, path=ALIASES_FILE):
+        if not os.path.exists(path):
+            return cls(path=path)
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f), path=path)
+
+    def save(self, path=None):
+        """Write atomically so a concurrent reader never sees a partial file"""
+        path = path or self.path
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(dict(sorted(self.aliases.items())), f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @property
+    def version(self):
+        """Fingerprint of the mapping, for cache keys"""
+        encoded = json.dumps(sorted(self.aliases.items()), ensure_ascii=False).encode('utf-8')
+        return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+    def resolve(self, name):
+        return self.aliases.get(normalize_name(name), name)
+
+    def merge(self, sources, target):
+        """Map every source name, and anything already aliased to one, onto ``target``"""
+        source_keys = {normalize_name(source) for source in sources}
+        for alias, name in list(self.aliases.items()):
+            if normalize_name(name) in source_keys:
+                self.aliases[alias] = target
+        for key in source_keys:
+            self.aliases[key] = target
+        self.aliases[normalize_name(target)] = target
+
+    def __len__(self):
+        return len(self.aliases)
+
+
+def canonicalize_restaurants(names, aliases=None):
+    """Canonical display name for every entry of ``names`` (a Series).
+
+    Without an alias for a key, the most frequent spelling of that key is
+    used as its display name.
+    """
+    codes, uniques = pd.factorize(names)
+    if len(uniques) == 0:
+        return names.copy()
+    spellings = pd.Series(uniques).astype(str).str.replace(r'\s+', ' ', regex=True).str.strip()
+    keys = normalize_names(spellings)
+
+    frequency = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    by_key = pd.DataFrame({'key': keys, 'name': spellings, 'frequency': frequency})
+    by_key = by_key.sort_values('frequency', ascending=False, kind='stable').drop_duplicates('key')
+    display = dict(zip(by_key['key'], by_key['name']))
+
+    if aliases:
+        for key in display:
+            if key in aliases.aliases:
+                display[key] = aliases.aliases[key]
+
+    canonical = keys.map(display).to_numpy()
+    result = np.where(codes >= 0, canonical[np.maximum(codes, 0)], None)
+    return pd.Series(result, index=names.index, name=names.name)
+
+
+def trigrams(key):
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Posting lists of character trigrams for fuzzy name lookup"""
+
+    def __init__(self, names=()):
+        self.names = []
+        self._grams = []
+        self._postings = defaultdict(set)
+        for name in names:
+            self.add(name)
+
+    def add(self, name):
+        position = len(self.names)
+        grams = trigrams(normalize_name(name))
+        self.names.append(name)
+        self._grams.append(grams)
+        for gram in grams:
+            self._postings[gram].add(position)
+        return position
+
+    def _matches(self, name, threshold):
+        grams = trigrams(normalize_name(name))
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+        for position, count in shared.items():
+            score = count / (len(grams) + len(self._grams[position]) - count)
+            if score >= threshold:
+                yield position, score
+
+    def similar(self, name, threshold=0.5, limit=10):
+        """``(name, jaccard)`` of indexed names sharing enough trigrams, best first"""
+        matches = [(self.names[position], score) for position, score in self._matches(name, threshold)]
+        matches.sort(key=lambda match: (-match[1], match[0]))
+        return matches[:limit]
+
+    def candidate_pairs(self, threshold=0.5):
+        """Distinct pairs of indexed names similar enough to be the same restaurant"""
+        pairs = []
+        for position, name in enumerate(self.names):
+            for other, score in self._matches(name, threshold):
+                if other > position:
+                    pairs.append((name, self.names[other], score))
+        pairs.sort(key=lambda pair: -pair[2])
+        return pairs
@@ -0,0 +1,183 @@
+"""Duplicate detection for expenses written to the sheet.
+
+``ExpenseIndex`` keeps a hash count of every expense's identity
+(date, payer, normalized restaurant, amount in cents), so checking a new
+row is a dictionary lookup instead of a scan of the sheet. The index is
+rebuilt when the sheet's data version changes and updated in place after
+each successful append, so a second session or a double-click sees the
+row before the next fetch.
+
+Each submission also carries an idempotency key; ``append_once`` writes a
+key's rows at most once, and after a failed request it checks whether the
+rows landed anyway before reporting the error. The rows written are
+recorded against the key after every append batch, by content, so
+retrying a large import that failed part-way writes only the rows that
+have not landed, even when the retry leaves out rows found in the sheet.
+Keys and progress can be kept in a JSON file so a retry after a restart
+is recognized too.
+"""
+import json
+import os
+import threading
+import uuid
+from collections import Counter, OrderedDict
+
+from ledger import sheets
+from ledger.importers import expense_key
+from ledger.model import compute_data_version
+
+# Idempotency keys remembered per process; old keys are only needed while
+# a retry of the same submission can still arrive
+MAX_IDEMPOTENCY_KEYS = 10_000
+IDEMPOTENCY_KEYS_FILE = 'idempotency_keys.json'
+
+
+def safe_key(row):
+    """``expense_key`` or None for rows that are not complete expenses"""
+    try:
+        return expense_key(row)
+    except (ValueError, IndexError, AttributeError, TypeError):
+        return None
+
+
+def new_idempotency_key():
+    return uuid.uuid4().hex
+
+
+class ExpenseIndex:
+    """Counts of expense keys in the sheet plus the idempotency keys already applied"""
+
+    def __init__(self, rows=(), version=None, keys_path=None):
+        self._lock = threading.Lock()
+        self._applied = OrderedDict()
+        # Fingerprint counts of the rows already written for keys whose
+        # append stopped part-way
+        self._progress = {}
+        self.keys_path = keys_path
+        if keys_path and os.path.exists(keys_path):
+            with open(keys_path, encoding='utf-8') as f:
+                keys = json.load(f)
+            self._applied.update((key, True) for key in keys.get('applied', []))
+            self._progress.update(
+                (key, Counter(written)) for key, written in keys.get('progress', {}).items()
+                if isinstance(written, dict)
+            )
+        self.version = None
+        self.counts = Counter()
+        self.sync(version, rows)
+
+    def sync(self, version, rows):
+        """Rebuild from the sheet rows (header excluded) when the data version changed"""
+        with self._lock:
+            if version is not None and version == self.version:
+                return False
+            self.counts = Counter(key for key in map(safe_key, rows) if key is not None)
+            self.version = version
+            return True
+
+    def contains(self, row):
+        key = safe_key(row)
+        return key is not None and self.counts[key] > 0
+
+    def duplicates(self, rows):
+        """Rows already in the index or repeated earlier in ``rows``"""
+        seen = Counter()
+        found = []
+        for row in rows:
+            key = safe_key(row)
+            if key is None:
+                continue
+            if self.counts[key] + seen[key] > 0:
+                found.append(row)
+            seen[key] += 1
+        return found
+
+    def add(self, rows):
+        with self._lock:
+            self.counts.update(key for key in map(safe_key, rows) if key is not None)
+
+    def was_applied(self, idempotency_key):
+        return idempotency_key in self._applied
+
+    def progress(self, idempotency_key):
+        """Fingerprint counts of the rows this key's earlier attempts already wrote"""
+        return Counter(self._progress.get(idempotency_key, ()))
+
+    def mark_progress(self, idempotency_key, rows):
+        with self._lock:
+            self._progress.setdefault(idempotency_key, Counter()).update(map(row_fingerprint, rows))
+            self._save()
+
+    def mark_applied(self, idempotency_key):
+        with self._lock:
+            self._progress.pop(idempotency_key, None)
+            self._applied[idempotency_key] = True
+            while len(self._applied) > MAX_IDEMPOTENCY_KEYS:
+                self._applied.popitem(last=False)
+            self._save()
+
+    def _save(self):
+        """Write keys and progress atomically; call with the lock held"""
+        if not self.keys_path:
+            return
+        tmp_path = f'{self.keys_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'applied': list(self._applied), 'progress': self._progress}, f)
+        os.replace(tmp_path, self.keys_path)
+
+
+def row_fingerprint(row):
+    """Content hash of one row exactly as written"""
+    return compute_data_version([row])
+
+
+def pending_rows(rows, written):
+    """``rows`` less one occurrence of each fingerprint counted in ``written``"""
+    written = Counter(written)
+    pending = []
+    for row in rows:
+        fingerprint = row_fingerprint(row)
+        if written[fingerprint] > 0:
+            written[fingerprint] -= 1
+        else:
+            pending.append(row)
+    return pending
+
+
+def rows_landed(rows, index, current_rows):
+    """Whether the sheet holds every row in ``rows`` on top of what the index counted"""
+    wanted = Counter(key for key in map(safe_key, rows) if key is not None)
+    present = Counter(key for key in map(safe_key, current_rows) if key is not None)
+    return all(present[key] >= index.counts[key] + count for key, count in wanted.items())
+
+
+def append_once(service, rows, idempotency_key, index, spreadsheet_id=sheets.SPREADSHEET_ID,
+                progress=None):
+    """Append rows unless this idempotency key was already applied.
+
+    Returns False when the key had been applied before. Rows go out in
+    the same batches as ``sheets.append_rows`` and each batch that lands
+    is added to the index and recorded against the key. If a request
+    fails, the sheet is re-read and the error is only raised when that
+    batch did not land; a retry with the same key skips the rows that
+    did, so retrying a timed-out submission is safe.
+    """
+    rows = list(rows)
+    if index.was_applied(idempotency_key):
+        return False
+    pending = pending_rows(rows, index.progress(idempotency_key))
+    done = len(rows) - len(pending)
+    for batch in sheets.batch_rows(pending):
+        try:
+            sheets.append_rows(service, batch, spreadsheet_id)
+        except Exception:
+            current_rows = sheets.fetch_sheet_data(service, spreadsheet_id)[1:]
+            if not rows_landed(batch, index, current_rows):
+                raise
+        index.add(batch)
+        index.mark_progress(idempotency_key, batch)
+        done += len(batch)
+        if progress is not None:
+            progress(done, len(rows))
+    index.mark_applied(idempotency_key)
+    return True
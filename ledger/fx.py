@@ -0,0 +1,81 @@
+"""Exchange rates for expenses paid in another currency.
+
+Rates live in a CSV file with one row per day and currency::
+
+    date,currency,rate
+    2025-07-01,EUR,1.4862
+    2025-07-02,EUR,1.4901
+
+``rate`` is the price of one unit of ``currency`` in the reporting
+currency. An expense is converted at the latest rate on or before its
+date, found with one ``np.searchsorted`` per currency over that
+currency's sorted dates; expenses dated before the first rate use the
+first rate. Expenses with an empty currency are already in the
+reporting currency.
+"""
+import csv
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+REPORTING_CURRENCY = os.environ.get('RESTAURANT_TRACKER_CURRENCY', 'CAD')
+RATES_FILE = 'fx_rates.csv'
+
+
+class FxRates:
+    """Per-currency arrays of rate dates (sorted) and rates"""
+
+    def __init__(self, rows=(), reporting=REPORTING_CURRENCY, path=None):
+        self.reporting = reporting
+        self.path = path
+        frame = pd.DataFrame(list(rows), columns=['date', 'currency', 'rate'])
+        frame['date'] = pd.to_datetime(frame['date']).astype('datetime64[ns]')
+        frame['currency'] = frame['currency'].astype(str).str.strip().str.upper()
+        frame['rate'] = pd.to_numeric(frame['rate'])
+        frame = frame.sort_values(['currency', 'date']).drop_duplicates(['currency', 'date'], keep='last')
+        self.tables = {
+            currency: (group['date'].to_numpy(), group['rate'].to_numpy(dtype=float))
+            for currency, group in frame.groupby('currency')
+        }
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+        self.version = f'{reporting}-{digest.hexdigest()}'
+
+    @classmethod
+    def load(cls, path=RATES_FILE, reporting=REPORTING_CURRENCY):
+        if not os.path.exists(path):
+            return cls(reporting=reporting, path=path)
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = [(row['date'], row['currency'], row['rate']) for row in csv.DictReader(f)]
+        return cls(rows, reporting=reporting, path=path)
+
+    @property
+    def currencies(self):
+        return [self.reporting] + sorted(currency for currency in self.tables if currency != self.reporting)
+
+    def rates_for(self, currency, dates):
+        """Rate in force on each of ``dates`` (datetime64 array); NaN for an unknown currency"""
+        if currency in ('', self.reporting):
+            return np.ones(len(dates))
+        if currency not in self.tables:
+            return np.full(len(dates), np.nan)
+        rate_dates, rates = self.tables[currency]
+        position = np.searchsorted(rate_dates, dates, side='right') - 1
+        return rates[np.maximum(position, 0)]
+
+    def to_reporting(self, amounts, currencies, dates):
+        """Convert Series of amounts, currency codes and dates to the reporting currency"""
+        codes, uniques = pd.factorize(currencies.fillna('').astype(str).str.strip().str.upper())
+        dates = pd.to_datetime(dates).to_numpy(dtype='datetime64[ns]')
+        rates = np.ones(len(amounts))
+        for code, currency in enumerate(uniques):
+            rows = codes == code
+            rates[rows] = self.rates_for(currency, dates[rows])
+        return pd.Series(amounts.to_numpy(dtype=float) * rates, index=amounts.index)
+
+    def missing(self, currencies):
+        """Currencies in use that have no rates"""
+        used = set(currencies.fillna('').astype(str).str.strip().str.upper()) - {'', self.reporting}
+        return sorted(used - set(self.tables))
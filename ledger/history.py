@@ -0,0 +1,203 @@
+"""Point-in-time views of the ledger.
+
+Every change to the sheet is appended to a change log, one JSON line per
+event, and never rewritten::
+
+    {"seq": 41, "time": "2025-07-02T19:04:11.532810", "label": "Add 1 expense(s)",
+     "kind": "append", "rows": [["2025-07-02", "Katy", "Miss Pho", "42.5", "", ""]]}
+
+Events are ``append`` (rows at the end), ``truncate`` (the last ``count``
+rows removed, undoing an append), ``edit`` (``cells`` of 1-based row,
+0-based column and value), ``delete`` (1-based ``positions``), ``insert``
+(``rows`` put back at ``positions``) and ``reset``, recorded when the
+sheet was changed outside the app and the log can only take its new
+contents as given.
+
+Every ``SNAPSHOT_EVERY`` events, and at every reset, the full sheet is
+written to a snapshot along with the log's byte offset at that point. The
+sheet as it was at any time is rebuilt from the latest snapshot taken
+before then plus the log lines after that snapshot's offset, so a query
+reads one snapshot and at most ``SNAPSHOT_EVERY`` events however long
+the history is. Nothing before the first event can be reconstructed.
+"""
+import bisect
+import json
+import os
+import threading
+from collections import deque
+from datetime import datetime
+
+from ledger.journal import same_row
+from ledger.model import compute_data_version, pad_rows
+
+HISTORY_DIR = 'ledger_history'
+SNAPSHOT_EVERY = 200
+# Recent events kept in memory for the "before this change" list
+RECENT_EVENTS = 20
+
+
+def timestamp(when):
+    """Log time text for a datetime; these sort in time order"""
+    return when.isoformat(timespec='microseconds')
+
+
+def apply_event(rows, event):
+    """Apply one logged event to ``rows`` (the sheet, header included) in place"""
+    kind = event['kind']
+    if kind == 'append':
+        rows.extend(pad_rows([rows[0]] + event['rows'])[1:] if rows else event['rows'])
+    elif kind == 'truncate':
+        del rows[len(rows) - event['count']:]
+    elif kind == 'edit':
+        for row, col, value in event['cells']:
+            target = rows[row - 1]
+            target.extend([''] * (col + 1 - len(target)))
+            target[col] = value
+    elif kind == 'delete':
+        for position in sorted(event['positions'], reverse=True):
+            del rows[position - 1]
+    elif kind == 'insert':
+        for position, row in sorted(zip(event['positions'], event['rows'])):
+            rows.insert(position - 1, list(row))
+    elif kind == 'reset':
+        rows[:] = [list(row) for row in event['rows']]
+    else:
+        raise ValueError(f"Unknown history event: {kind}")
+
+
+def journal_events(entry, reverse):
+    """Log events for a journal entry that was applied (``reverse``: undone)"""
+    kind = entry['kind']
+    if kind == 'append':
+        if reverse:
+            return [{'kind': 'truncate', 'count': len(entry['rows'])}]
+        return [{'kind': 'append', 'rows': entry['rows']}]
+    if kind == 'edit':
+        value = 2 if reverse else 3
+        return [{'kind': 'edit', 'cells': [[cell[0], cell[1], cell[value]] for cell in entry['cells']]}]
+    if reverse:
+        return [{'kind': 'insert', 'positions': entry['positions'], 'rows': entry['rows']}]
+    return [{'kind': 'delete', 'positions': entry['positions']}]
+
+
+class History:
+    """Append-only change log and snapshots in a directory"""
+
+    def __init__(self, path=HISTORY_DIR):
+        self.path = path
+        self.log_path = os.path.join(path, 'changes.jsonl')
+        self.snapshot_dir = os.path.join(path, 'snapshots')
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        # (time, seq, file name), oldest first; names are '<seq>_<time>.json'
+        self._snapshots = sorted(
+            (name[11:-5].replace('_', ':'), int(name[:10]), name)
+            for name in os.listdir(self.snapshot_dir) if name.endswith('.json')
+        )
+        self.recent = deque(maxlen=RECENT_EVENTS)
+        self._load_head()
+
+    def _load_head(self):
+        """Current state: the latest snapshot plus every event logged after it"""
+        self.head, self.seq, self.time, offset = [], 0, '', 0
+        if self._snapshots:
+            snapshot = self._read_snapshot(self._snapshots[-1][2])
+            self.head, self.seq, self.time, offset = snapshot['rows'], snapshot['seq'], snapshot['time'], snapshot['offset']
+        self.since_snapshot = 0
+        for event in self._events_from(offset):
+            apply_event(self.head, event)
+            self.seq, self.time = event['seq'], event['time']
+            self.since_snapshot += 1
+            self.recent.append(_summary(event))
+        self.version = compute_data_version(self.head)
+
+    def _read_snapshot(self, name):
+        with open(os.path.join(self.snapshot_dir, name), encoding='utf-8') as f:
+            return json.load(f)
+
+    def _events_from(self, offset):
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def _log(self, event, label):
+        """Append one event, apply it to the head and snapshot when due; call with the lock held"""
+        # Never go back in time, even if the clock does
+        event = {'seq': self.seq + 1, 'time': max(timestamp(datetime.now()), self.time), 'label': label, **event}
+        apply_event(self.head, event)
+        self.seq, self.time = event['seq'], event['time']
+        with open(self.log_path, 'ab') as f:
+            f.write(json.dumps(event, ensure_ascii=False).encode('utf-8') + b'\n')
+            offset = f.tell()
+        self.recent.append(_summary(event))
+        self.version = compute_data_version(self.head)
+        self.since_snapshot += 1
+        if event['kind'] == 'reset' or self.since_snapshot >= SNAPSHOT_EVERY:
+            self._snapshot(offset)
+
+    def _snapshot(self, offset):
+        """Write the head with the log offset of the first event after it"""
+        name = f"{self.seq:010d}_{self.time.replace(':', '_')}.json"
+        tmp_path = os.path.join(self.snapshot_dir, f'{name}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'seq': self.seq, 'time': self.time, 'offset': offset, 'rows': self.head}, f, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(self.snapshot_dir, name))
+        self._snapshots.append((self.time, self.seq, name))
+        self.since_snapshot = 0
+
+    def record_entry(self, entry, reverse=False):
+        """Log a journal entry that was just applied to the sheet (``reverse``: undone)"""
+        with self._lock:
+            label = f"Undo: {entry['label']}" if reverse else entry['label']
+            try:
+                for event in journal_events(entry, reverse):
+                    self._log(event, label)
+            except (IndexError, OSError):
+                # The head is out of step with the sheet; the next sync logs the sheet as a reset
+                self.version = None
+
+    def sync(self, rows, version=None):
+        """Reconcile with the sheet as fetched; logs a reset if it was changed elsewhere.
+
+        Differences in number formatting only ('30' read back for '30.0')
+        are taken over without an event.
+        """
+        version = version or compute_data_version(rows)
+        with self._lock:
+            if version == self.version:
+                return False
+            if self.seq and len(rows) == len(self.head) and all(map(same_row, rows, self.head)):
+                self.head = [list(row) for row in rows]
+                self.version = version
+                return False
+            label = "Changed outside the app" if self.seq else "History started"
+            self._log({'kind': 'reset', 'rows': rows}, label)
+            return True
+
+    @property
+    def start(self):
+        """Earliest time the log can rebuild, or None before anything was logged"""
+        return datetime.fromisoformat(self._snapshots[0][0]) if self._snapshots else None
+
+    def rows_at(self, when):
+        """The sheet (header included) as it was at datetime ``when``; None before the history starts"""
+        moment = timestamp(when)
+        with self._lock:
+            position = bisect.bisect_right(self._snapshots, (moment, float('inf'), '')) - 1
+            if position < 0:
+                return None
+            snapshot = self._read_snapshot(self._snapshots[position][2])
+            rows = snapshot['rows']
+            for event in self._events_from(snapshot['offset']):
+                if event['time'] > moment:
+                    break
+                apply_event(rows, event)
+            return rows
+
+
+def _summary(event):
+    return {'seq': event['seq'], 'time': event['time'], 'label': event['label']}
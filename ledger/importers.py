@@ -0,0 +1,246 @@
+"""Bulk import of expenses from CSV exports and OFX/QFX bank statements.
+
+Files are read as streams and turned into ledger rows
+``[YYYY-MM-DD, Name, Restaurant, Amount]``. Rows already present in the
+sheet (same date, person, restaurant and amount) or repeated within the
+import are dropped before anything is written, and the remaining rows are
+appended in a few large batches.
+
+Command line usage, from the repository root:
+
+    python -m ledger.importers statement.ofx --name Katy --credentials service_account.json
+    python -m ledger.importers expenses.csv --endpoint http://127.0.0.1:8765/ --dry-run
+"""
+import argparse
+import csv
+import io
+import json
+import re
+import sys
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from ledger import sheets
+
+# Header aliases recognised in CSV exports, compared case-insensitively
+DATE_HEADERS = ('date', 'transaction date', 'posted date', 'posting date')
+NAME_HEADERS = ('name', 'cardholder', 'card member', 'paid by')
+RESTAURANT_HEADERS = ('restaurant', 'description', 'merchant', 'payee', 'details')
+AMOUNT_HEADERS = ('amount', 'debit', 'bill amount', 'total')
+
+DATE_FORMATS = ('%Y-%m-%d', '%Y/%m/%d', '%m/%d/%Y', '%d.%m.%Y', '%Y%m%d')
+
+# Card processors prefix merchant names on statements ("SQ *MISS PHO")
+_PROCESSOR_PREFIX = re.compile(r'^(?:SQ \*|SQU\*|TST\*\s*|PAYPAL \*|PP\*|SP \*|DD \*)', re.IGNORECASE)
+_OFX_FIELD = re.compile(r'<(\w+)>([^<\r\n]*)')
+
+
+class UnreadableRow(ValueError):
+    """A source row could not be turned into an expense"""
+
+
+def parse_date(text, formats=DATE_FORMATS):
+    """Normalize a date (optionally followed by a time) to YYYY-MM-DD"""
+    text = text.strip()
+    for candidate in (text, re.split(r'[ T]', text, maxsplit=1)[0]):
+        for fmt in formats:
+            try:
+                return datetime.strptime(candidate, fmt).strftime('%Y-%m-%d')
+            except ValueError:
+                continue
+    raise UnreadableRow(f"Unrecognised date: {text!r}")
+
+
+def parse_amount(text):
+    """Amount as a positive Decimal rounded to cents; bank debits are negative"""
+    cleaned = re.sub(r'[^\d.,\-]', '', text.strip())
+    if cleaned.count(',') and not cleaned.count('.'):
+        cleaned = cleaned.replace(',', '.')
+    cleaned = cleaned.replace(',', '')
+    try:
+        amount = abs(Decimal(cleaned)).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise UnreadableRow(f"Unrecognised amount: {text!r}") from None
+    if amount == 0:
+        raise UnreadableRow("Zero amount")
+    return amount
+
+
+def normalize_restaurant(text):
+    """Strip processor prefixes and whitespace noise from a merchant name"""
+    name = _PROCESSOR_PREFIX.sub('', text.strip())
+    name = re.sub(r'\s+', ' ', name).strip(' *-')
+    if name.isupper():
+        name = name.title()
+    return name
+
+
+def expense_key(row):
+    """Identity of an expense for duplicate detection"""
+    date, name, restaurant, amount = row[:4]
+    cents = int(parse_amount(str(amount)) * 100)
+    return (date, name.strip().casefold(), normalize_restaurant(restaurant).casefold(), cents)
+
+
+def _column(fieldnames, aliases):
+    lowered = {field.strip().lower(): field for field in fieldnames if field}
+    for alias in aliases:
+        if alias in lowered:
+            return lowered[alias]
+    return None
+
+
+def read_csv_expenses(stream, default_name=None):
+    """Yield ``(line_number, row_or_error)`` for every data line of a CSV stream"""
+    reader = csv.DictReader(stream)
+    fieldnames = reader.fieldnames or []
+    date_col = _column(fieldnames, DATE_HEADERS)
+    name_col = _column(fieldnames, NAME_HEADERS)
+    restaurant_col = _column(fieldnames, RESTAURANT_HEADERS)
+    amount_col = _column(fieldnames, AMOUNT_HEADERS)
+    if not (date_col and restaurant_col and amount_col):
+        raise UnreadableRow(f"CSV needs date, description and amount columns, found {fieldnames}")
+
+    for record in reader:
+        try:
+            name = (record.get(name_col) or '').strip() if name_col else ''
+            name = name or default_name
+            if not name:
+                raise UnreadableRow("No payer name and no default name given")
+            yield reader.line_num, [
+                parse_date(record[date_col]),
+                name,
+                normalize_restaurant(record[restaurant_col]),
+                str(parse_amount(record[amount_col])),
+            ]
+        except (UnreadableRow, KeyError, TypeError) as e:
+            yield reader.line_num, UnreadableRow(str(e))
+
+
+def read_ofx_expenses(stream, default_name):
+    """Yield ``(transaction_number, row_or_error)`` for every debit in an OFX/QFX stream.
+
+    Handles both SGML (unclosed tags) and XML statements by reading one
+    ``<STMTTRN>`` block at a time.
+    """
+    number = 0
+    fields = None
+    for line in stream:
+        for tag, value in _OFX_FIELD.findall(line):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                fields = {}
+            elif fields is not None and value.strip():
+                fields[tag] = value.strip()
+        if fields is not None and '</STMTTRN>' in line.upper():
+            number += 1
+            row = _ofx_row(fields, default_name)
+            if row is not None:
+                yield number, row
+            fields = None
+
+
+def _ofx_row(fields, default_name):
+    try:
+        if Decimal(fields['TRNAMT']) > 0:
+            return None  # Credits and refunds are not expenses
+        if not default_name:
+            raise UnreadableRow("OFX statements need a default payer name")
+        return [
+            parse_date(fields['DTPOSTED'][:8], ('%Y%m%d',)),
+            default_name,
+            normalize_restaurant(fields.get('NAME') or fields.get('MEMO', '')),
+            str(parse_amount(fields['TRNAMT'])),
+        ]
+    except (UnreadableRow, KeyError, InvalidOperation) as e:
+        return UnreadableRow(str(e))
+
+
+def read_expenses(stream, filename, default_name=None):
+    """Dispatch on the file extension; OFX/QFX need a default payer name"""
+    if filename.lower().endswith(('.ofx', '.qfx')):
+        return read_ofx_expenses(stream, default_name)
+    return read_csv_expenses(stream, default_name)
+
+
+def text_stream(binary):
+    """Wrap an uploaded binary file for the readers above"""
+    return io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
+
+
+class ImportPlan:
+    """Rows to write plus what was skipped and why"""
+
+    def __init__(self):
+        self.rows = []
+        self.duplicates = []
+        self.errors = []
+
+    def summary(self):
+        return (f"{len(self.rows)} new, {len(self.duplicates)} duplicate(s), "
+                f"{len(self.errors)} unreadable")
+
+
+def plan_import(parsed, existing_rows=(), index=None):
+    """Drop rows already in the sheet (header excluded) or repeated in the import.
+
+    Pass a ``ledger.dedupe.ExpenseIndex`` as ``index`` to check against it
+    instead of hashing ``existing_rows`` again.
+    """
+    seen = set()
+    if index is None:
+        for row in existing_rows:
+            try:
+                seen.add(expense_key(row))
+            except (ValueError, IndexError, AttributeError):
+                continue
+
+    plan = ImportPlan()
+    for position, row in parsed:
+        if isinstance(row, Exception):
+            plan.errors.append((position, str(row)))
+            continue
+        key = expense_key(row)
+        if key in seen or (index is not None and index.counts[key] > 0):
+            plan.duplicates.append((position, row))
+        else:
+            seen.add(key)
+            plan.rows.append(row)
+    return plan
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Bulk-import expenses into the Google Sheet')
+    parser.add_argument('files', nargs='+', help='CSV, OFX or QFX files')
+    parser.add_argument('--name', help='payer for rows without a name column (required for OFX)')
+    parser.add_argument('--credentials', help='service account JSON file')
+    parser.add_argument('--endpoint', help='local Sheets stand-in URL instead of Google')
+    parser.add_argument('--spreadsheet-id', default=sheets.SPREADSHEET_ID)
+    parser.add_argument('--dry-run', action='store_true', help='only report what would be written')
+    args = parser.parse_args(argv)
+
+    if args.endpoint:
+        service = sheets.connect_local(args.endpoint)
+    elif args.credentials:
+        with open(args.credentials) as f:
+            service = sheets.connect(json.load(f))
+    else:
+        parser.error('one of --credentials or --endpoint is required')
+
+    existing = sheets.fetch_sheet_data(service, args.spreadsheet_id)[1:]
+    for path in args.files:
+        with open(path, newline='', encoding='utf-8-sig') as stream:
+            plan = plan_import(read_expenses(stream, path, args.name), existing)
+        print(f"{path}: {plan.summary()}")
+        for position, message in plan.errors:
+            print(f"  line {position}: {message}", file=sys.stderr)
+        if plan.rows and not args.dry_run:
+            def progress(done, total):
+                print(f"  appended {done}/{total} rows")
+            sheets.append_rows(service, plan.rows, args.spreadsheet_id, progress=progress)
+        existing.extend(plan.rows)
+
+
+
+if __name__ == '__main__':
+    main()
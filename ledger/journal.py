@@ -0,0 +1,237 @@
+"""Undo and redo for writes to the ledger sheet.
+
+Every append, edit and delete made through the app is recorded with what
+it takes to reverse it: appended rows, each edited cell's old and new
+value, and deleted rows with their positions. Undoing an entry moves it
+to the redo stack and redoing moves it back; a new write clears the redo
+stack. The journal is stored as JSON so a bulk delete can still be
+undone after a restart. A delete also keeps the rows left on either side
+of each deleted row, so undoing it can tell whether they are still where
+the rows go back.
+
+An undo or redo is sent as a single ``spreadsheets.batchUpdate`` (or one
+append, to redo an append), however many rows it touches, so it either
+applies completely or not at all. Before anything is written the sheet
+is read once and checked to still look the way the entry left it; if it
+was changed in some other way, ``SheetsError`` is raised and nothing is
+touched.
+"""
+import bisect
+import json
+import os
+import threading
+from datetime import datetime
+
+from ledger import sheets
+
+JOURNAL_FILE = 'operation_journal.json'
+# Entries kept on each stack; older ones can no longer be undone
+MAX_ENTRIES = 50
+
+
+def same_value(a, b):
+    """Whether two cell texts hold the same value ('30' and '30.0' do)"""
+    if a == b:
+        return True
+    try:
+        return float(a) == float(b)
+    except (TypeError, ValueError):
+        return False
+
+
+def same_row(a, b):
+    width = max(len(a), len(b))
+    a = list(a) + [''] * (width - len(a))
+    b = list(b) + [''] * (width - len(b))
+    return all(same_value(x, y) for x, y in zip(a, b))
+
+
+def appended(rows, label):
+    return {'kind': 'append', 'label': label, 'rows': [list(row) for row in rows]}
+
+
+def edited(cells, label):
+    """``cells`` are ``(row, col, old, new)`` with 1-based sheet rows and 0-based columns"""
+    return {'kind': 'edit', 'label': label, 'cells': [list(cell) for cell in cells]}
+
+
+def deleted(positions, current, label):
+    """Deleting the 1-based sheet rows ``positions`` from ``current``, the sheet (header included) before it"""
+    positions = list(positions)
+    removed = set(positions)
+    remaining = [row for position, row in enumerate(current, 1) if position not in removed]
+    return {
+        'kind': 'delete', 'label': label, 'positions': positions,
+        'rows': [list(current[position - 1]) for position in positions],
+        'length': len(remaining),
+        # Rows above and below where each deleted row goes back; None at the sheet's end
+        'neighbours': [
+            [_row_near(remaining, gap - 1), _row_near(remaining, gap)]
+            for gap in _gaps(positions)
+        ],
+    }
+
+
+def _gaps(positions):
+    """0-based index each deleted row takes when put back into the sheet left by the delete"""
+    ordered = sorted(positions)
+    return [position - 1 - bisect.bisect_left(ordered, position) for position in positions]
+
+
+def _row_near(rows, index):
+    return list(rows[index]) if 0 <= index < len(rows) else None
+
+
+class Journal:
+    """Undo and redo stacks of ledger writes, persisted as JSON"""
+
+    def __init__(self, undo=None, redo=None, path=None):
+        self.path = path
+        self.undo_stack = list(undo or [])
+        self.redo_stack = list(redo or [])
+        # Held while an entry is applied so two sessions never undo the same write
+        self.lock = threading.Lock()
+        # Called with (entry, reverse) after every write, undo and redo, in order
+        self.listeners = []
+
+    @classmethod
+    def load(cls, path=JOURNAL_FILE):
+        if not os.path.exists(path):
+            return cls(path=path)
+        with open(path, encoding='utf-8') as f:
+            stacks = json.load(f)
+        return cls(stacks.get('undo'), stacks.get('redo'), path=path)
+
+    def save(self, path=None):
+        """Write atomically so a concurrent reader never sees a partial file"""
+        path = path or self.path
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'undo': self.undo_stack, 'redo': self.redo_stack}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @property
+    def next_undo(self):
+        return self.undo_stack[-1] if self.undo_stack else None
+
+    @property
+    def next_redo(self):
+        return self.redo_stack[-1] if self.redo_stack else None
+
+    def record(self, entry):
+        """Push a write that was just made"""
+        with self.lock:
+            entry = dict(entry, time=datetime.now().isoformat(timespec='seconds'))
+            self.undo_stack = (self.undo_stack + [entry])[-MAX_ENTRIES:]
+            self.redo_stack = []
+            self.save()
+            self._notify(entry, reverse=False)
+
+    def _notify(self, entry, reverse):
+        for listener in self.listeners:
+            listener(entry, reverse)
+
+    def delete_rows(self, service, positions, expected_rows, label, spreadsheet_id=sheets.SPREADSHEET_ID):
+        """Delete 1-based sheet rows in one request and record them.
+
+        Raises ``SheetsError`` without deleting anything when the rows at
+        ``positions`` are no longer ``expected_rows`` (the sheet changed
+        since it was displayed).
+        """
+        positions = list(positions)
+        with self.lock:
+            current = sheets.fetch_sheet_data(service, spreadsheet_id)
+            rows = [current[position - 1] if position <= len(current) else [] for position in positions]
+            if not all(same_row(row, expected) for row, expected in zip(rows, expected_rows)):
+                raise sheets.SheetsError("The sheet changed since it was loaded; reload and try again")
+            sheet_id = sheets.get_sheet_id(service, spreadsheet_id)
+            sheets.batch_update(service, sheets.delete_rows_requests(sheet_id, positions), spreadsheet_id)
+        self.record(deleted(positions, current, label))
+        return len(positions)
+
+    def undo(self, service, spreadsheet_id=sheets.SPREADSHEET_ID):
+        """Reverse the latest write; returns its entry"""
+        with self.lock:
+            if not self.undo_stack:
+                return None
+            entry = self.undo_stack[-1]
+            _apply(service, entry, reverse=True, spreadsheet_id=spreadsheet_id)
+            self.undo_stack.pop()
+            self.redo_stack = (self.redo_stack + [entry])[-MAX_ENTRIES:]
+            self.save()
+            self._notify(entry, reverse=True)
+            return entry
+
+    def redo(self, service, spreadsheet_id=sheets.SPREADSHEET_ID):
+        """Make the latest undone write again; returns its entry"""
+        with self.lock:
+            if not self.redo_stack:
+                return None
+            entry = self.redo_stack[-1]
+            _apply(service, entry, reverse=False, spreadsheet_id=spreadsheet_id)
+            self.redo_stack.pop()
+            self.undo_stack = (self.undo_stack + [entry])[-MAX_ENTRIES:]
+            self.save()
+            self._notify(entry, reverse=False)
+        return entry
+
+
+def _apply(service, entry, reverse, spreadsheet_id):
+    """Undo (``reverse``) or redo one entry after checking the sheet is in the state it expects"""
+    current = sheets.fetch_sheet_data(service, spreadsheet_id)
+    kind = entry['kind']
+
+    if kind == 'append' and not reverse:
+        sheets.append_rows(service, entry['rows'], spreadsheet_id)
+        return
+
+    if kind == 'append':
+        rows = entry['rows']
+        first = len(current) - len(rows) + 1
+        expected = first > 1 and all(same_row(row, wanted) for row, wanted in zip(current[first - 1:], rows))
+        positions = range(first, len(current) + 1)
+    elif kind == 'edit':
+        # Undoing expects the new values in place and writes the old ones; redoing the opposite
+        before, after = (1, 0) if reverse else (0, 1)
+        expected = all(
+            row <= len(current) and same_value(_cell(current[row - 1], col), values[before])
+            for row, col, *values in entry['cells']
+        )
+    elif reverse:
+        # The rows around each gap must still be the ones the delete left there
+        neighbours = entry.get('neighbours')
+        expected = neighbours is not None and len(current) == entry['length'] and all(
+            _same_or_missing(_row_near(current, gap - 1), above) and _same_or_missing(_row_near(current, gap), below)
+            for gap, (above, below) in zip(_gaps(entry['positions']), neighbours)
+        )
+    else:
+        expected = all(
+            position <= len(current) and same_row(current[position - 1], row)
+            for position, row in zip(entry['positions'], entry['rows'])
+        )
+    if not expected:
+        raise sheets.SheetsError(f"The sheet changed after \"{entry['label']}\"; it can no longer be reversed here")
+
+    sheet_id = sheets.get_sheet_id(service, spreadsheet_id)
+    if kind == 'append':
+        requests = sheets.delete_rows_requests(sheet_id, positions)
+    elif kind == 'edit':
+        requests = [
+            sheets.update_cells_request(sheet_id, row, col, [[values[after]]])
+            for row, col, *values in entry['cells']
+        ]
+    elif reverse:
+        requests = sheets.insert_rows_requests(sheet_id, entry['positions'], entry['rows'])
+    else:
+        requests = sheets.delete_rows_requests(sheet_id, entry['positions'])
+    sheets.batch_update(service, requests, spreadsheet_id)
+
+
+def _same_or_missing(row, expected):
+    if row is None or expected is None:
+        return row is None and expected is None
+    return same_row(row, expected)
+
+
+def _cell(row, col):
+    return row[col] if col < len(row) else ''
@@ -0,0 +1,158 @@
+"""Google Sheets API call metrics in Prometheus text exposition format.
+
+Every Sheets request made by the app goes through ``execute()``, which
+records per endpoint and outcome:
+
+* ``sheets_requests_total`` - request counter
+* ``sheets_request_bytes_total`` / ``sheets_response_bytes_total`` - payload sizes
+* ``sheets_request_duration_seconds`` - latency histogram
+
+Outcomes are ``ok``, ``quota_exhausted`` (HTTP 429), ``client_error``,
+``server_error`` and ``error`` (no HTTP response, e.g. a timeout).
+
+The registry lives for the whole process. ``write_textfile()`` produces a
+file for node_exporter's textfile collector and ``start_http_server()``
+serves ``/metrics`` for direct scraping.
+"""
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def classify_outcome(exc):
+    """Map an exception raised by a Sheets request to a bounded outcome label"""
+    if exc is None:
+        return 'ok'
+    status = getattr(getattr(exc, 'resp', None), 'status', None)
+    if status is None:
+        return 'error'
+    status = int(status)
+    if status == 429:
+        return 'quota_exhausted'
+    if 400 <= status < 500:
+        return 'client_error'
+    return 'server_error'
+
+
+class SheetsMetrics:
+    """Thread-safe counters and histograms keyed by (endpoint, outcome)"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._request_bytes = {}
+        self._response_bytes = {}
+        self._histograms = {}
+
+    def observe(self, endpoint, outcome, seconds, request_bytes=0, response_bytes=0):
+        key = (endpoint, outcome)
+        with self._lock:
+            self._requests[key] = self._requests.get(key, 0) + 1
+            self._request_bytes[key] = self._request_bytes.get(key, 0) + request_bytes
+            self._response_bytes[key] = self._response_bytes.get(key, 0) + response_bytes
+
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram['buckets'][i] += 1
+            histogram['sum'] += seconds
+            histogram['count'] += 1
+
+    def render(self):
+        """Return all metrics in Prometheus text exposition format"""
+        with self._lock:
+            requests = dict(self._requests)
+            request_bytes = dict(self._request_bytes)
+            response_bytes = dict(self._response_bytes)
+            histograms = {key: {'buckets': list(value['buckets']), 'sum': value['sum'], 'count': value['count']}
+                          for key, value in self._histograms.items()}
+
+        lines = []
+
+        def counter(name, help_text, values):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for (endpoint, outcome), value in sorted(values.items()):
+                lines.append(f'{name}{{endpoint="{endpoint}",outcome="{outcome}"}} {value}')
+
+        counter('sheets_requests_total', 'Google Sheets API requests.', requests)
+        counter('sheets_request_bytes_total', 'Request body bytes sent to the Sheets API.', request_bytes)
+        counter('sheets_response_bytes_total', 'Response body bytes received from the Sheets API.', response_bytes)
+
+        name = 'sheets_request_duration_seconds'
+        lines.append(f'# HELP {name} Sheets API request latency.')
+        lines.append(f'# TYPE {name} histogram')
+        for (endpoint, outcome), histogram in sorted(histograms.items()):
+            labels = f'endpoint="{endpoint}",outcome="{outcome}"'
+            for bound, count in zip(self.buckets, histogram['buckets']):
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram["count"]}')
+            lines.append(f'{name}_sum{{{labels}}} {histogram["sum"]:.6f}')
+            lines.append(f'{name}_count{{{labels}}} {histogram["count"]}')
+
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = SheetsMetrics()
+
+
+def execute(endpoint, request, registry=REGISTRY):
+    """Execute a googleapiclient request and record its metrics"""
+    request_bytes = len(getattr(request, 'body', None) or b'')
+    response_bytes = 0
+
+    # Capture the raw response size without re-serializing the parsed result
+    postproc = getattr(request, 'postproc', None)
+    if postproc is not None:
+        def measuring_postproc(resp, content):
+            nonlocal response_bytes
+            response_bytes = len(content or b'')
+            return postproc(resp, content)
+        request.postproc = measuring_postproc
+
+    start = time.perf_counter()
+    try:
+        result = request.execute()
+    except Exception as e:
+        registry.observe(endpoint, classify_outcome(e), time.perf_counter() - start,
+                         request_bytes, response_bytes)
+        raise
+    registry.observe(endpoint, 'ok', time.perf_counter() - start, request_bytes, response_bytes)
+    return result
+
+
+def write_textfile(path, registry=REGISTRY):
+    """Atomically write the metrics for node_exporter's textfile collector"""
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(registry.render())
+    os.replace(tmp_path, path)
+
+
+def start_http_server(port, host='127.0.0.1', registry=REGISTRY):
+    """Serve GET /metrics from a daemon thread and return the server"""
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):  # noqa: A002 - matches the base signature
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,156 @@
+"""Shape of the expense ledger as stored in the Google Sheet."""
+import hashlib
+import math
+import os
+
+# Header of the sheet; every following row is one expense. Shares lists who
+# shared the bill: "Katy,Sebastien" splits it equally between them,
+# "Katy:2,Sebastien:1" by weight, and an empty cell means everyone.
+# Currency is an ISO code, empty for the reporting currency
+COLUMNS = ['Date', 'Name', 'Restaurant', 'Amount', 'Shares', 'Currency']
+
+# People sharing the bills, listed first in that order; anyone else named
+# in a Shares cell is added after them. A group can be configured with
+# RESTAURANT_TRACKER_PARTICIPANTS="Ana,Ben,Chloé,..."
+PARTICIPANTS_ENV = 'RESTAURANT_TRACKER_PARTICIPANTS'
+PARTICIPANTS = [
+    name.strip() for name in os.environ.get(PARTICIPANTS_ENV, 'Katy,Sebastien').split(',') if name.strip()
+]
+
+
+# A Shares cell as typed in the app's editors: names, each with an optional
+# non-negative weight
+SHARES_PATTERN = r'^\s*([^,:]+(:\s*\d+(\.\d*)?\s*)?(,\s*[^,:]+(:\s*\d+(\.\d*)?\s*)?)*)?$'
+
+
+def _share_weight(weight):
+    """Weight text as a float, or None when it is not a finite, non-negative number"""
+    try:
+        value = float(weight) if weight.strip() else 1.0
+    except ValueError:
+        return None
+    return value if math.isfinite(value) and value >= 0 else None
+
+
+def parse_shares(text):
+    """Weights by name from a Shares cell; empty for an expense everyone shares.
+
+    Entries with a weight that is not a non-negative number are skipped, so
+    a mistyped cell never stops the ledger from loading.
+    """
+    weights = {}
+    for part in str(text or '').split(','):
+        name, _, weight = part.partition(':')
+        name = name.strip()
+        value = _share_weight(weight)
+        if name and value is not None:
+            weights[name] = value
+    return weights
+
+
+def shares_error(text):
+    """Why a Shares cell is invalid, or None when it is valid (or empty)"""
+    parts = [part for part in str(text or '').split(',') if part.strip()]
+    weights = []
+    for part in parts:
+        name, _, weight = part.partition(':')
+        if not name.strip():
+            return f"'{part.strip()}' has no name"
+        value = _share_weight(weight)
+        if value is None:
+            return f"the weight of {name.strip()} must be a number of 0 or more"
+        weights.append(value)
+    if weights and not any(weights):
+        return "at least one weight must be above 0"
+    return None
+
+
+def format_shares(weights, participants):
+    """Shares cell for ``weights``; empty when all participants share equally"""
+    weights = {name: weight for name, weight in weights.items() if weight > 0}
+    if set(weights) == set(participants) and len(set(weights.values())) <= 1:
+        return ''
+    if len(set(weights.values())) <= 1:
+        return ','.join(weights)
+    return ','.join(f'{name}:{weight:g}' for name, weight in weights.items())
+
+
+def ledger_participants(data, configured=None):
+    """Configured participants followed by other names in the sheet's Shares cells (header included).
+
+    Payers are not added: a one-off or mistyped name would otherwise take
+    an equal share of every expense. See ``unknown_payers``.
+    """
+    names = list(PARTICIPANTS if configured is None else configured)
+    known = set(names)
+    shares_seen = set()
+    for row in data[1:]:
+        if len(row) <= 4 or not row[4] or row[4] in shares_seen:
+            continue
+        shares_seen.add(row[4])
+        for name in parse_shares(row[4]):
+            if name not in known:
+                known.add(name)
+                names.append(name)
+    return names
+
+
+def unknown_payers(data, participants):
+    """Payers in the sheet (header included) who are not among ``participants``, in order of appearance"""
+    known = set(participants)
+    names = {}
+    for row in data[1:]:
+        name = str(row[1]).strip() if len(row) > 1 else ''
+        if name and name not in known:
+            names[name] = None
+    return list(names)
+
+
+def pad_rows(data, columns=COLUMNS):
+    """Pad the header and rows to the ledger's width.
+
+    The Sheets API leaves out trailing empty cells, so rows written before
+    a column existed (or with it left empty) come back shorter.
+    """
+    if not data:
+        return data
+    width = len(columns)
+    header = list(data[0]) + columns[len(data[0]):]
+    return [header] + [row + [''] * (width - len(row)) if len(row) < width else row for row in data[1:]]
+
+
+def count_column(name):
+    """Summary table column holding the number of meals paid by ``name``"""
+    return f'{name} (Count)'
+
+
+def compute_data_version(data):
+    """Return a short fingerprint of the raw sheet values, used as a cache key."""
+    digest = hashlib.blake2b(digest_size=16)
+    for row in data:
+        digest.update('\x1f'.join(str(value) for value in row).encode('utf-8'))
+        digest.update(b'\x1e')
+    return digest.hexdigest()
+
+
+def expense_row(date, name, restaurant, amount, shares='', currency=''):
+    """Validate one expense and return it as a sheet row of strings.
+
+    ``date`` may be a date/datetime or an ISO string; raises ValueError when
+    a field is missing, the amount is not positive or the shares are invalid.
+    """
+    name = (name or '').strip()
+    restaurant = (restaurant or '').strip()
+    if not name or not restaurant:
+        raise ValueError("Name and restaurant are required")
+    if amount is None or amount != amount or float(amount) <= 0:
+        raise ValueError("Amount must be greater than 0")
+    if date is None or date != date:
+        raise ValueError("Date is required")
+    date_text = date if isinstance(date, str) else date.strftime('%Y-%m-%d')
+    shares = shares.strip() if isinstance(shares, str) else ''
+    error = shares_error(shares)
+    if error:
+        raise ValueError(f"Shared by: {error}")
+    currency = currency.strip().upper() if isinstance(currency, str) else ''
+    return [date_text, name, restaurant, str(float(amount)), shares, currency]
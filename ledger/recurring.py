@@ -0,0 +1,167 @@
+"""Recurring expenses: a weekly standing lunch, a monthly meal plan.
+
+Definitions are stored as JSON::
+
+    {
+      "definitions": [
+        {"id": "3f9c1a2b", "name": "Katy", "restaurant": "Miss Pho",
+         "amount": "14.5", "shares": "", "currency": "", "every": "week",
+         "interval": 1, "start": "2025-01-06", "end": null,
+         "through": "2025-03-03"}
+      ]
+    }
+
+``through`` is the last date already written to the sheet. A run
+materializes every occurrence after it up to today, so runs that were
+missed (the app was not opened for a while) are caught up by the next
+one, and all due occurrences of all definitions go out in one append.
+
+Runs are idempotent across restarts: an occurrence already in the sheet,
+because a run appended it but stopped before saving ``through``, is found
+in the ``ExpenseIndex`` and skipped, and the run's idempotency key is
+derived from its occurrences, so retrying the same run appends nothing.
+"""
+import hashlib
+import json
+import os
+import threading
+import uuid
+
+import pandas as pd
+
+from ledger import dedupe, sheets
+from ledger.model import expense_row
+
+RECURRING_FILE = 'recurring_expenses.json'
+FREQUENCIES = {
+    'day': lambda n: pd.DateOffset(days=n),
+    'week': lambda n: pd.DateOffset(weeks=n),
+    'month': lambda n: pd.DateOffset(months=n),
+}
+
+
+def occurrences(definition, after, today):
+    """Dates of ``definition`` after ``after`` (or from its start) up to ``today``.
+
+    Monthly dates are counted from the start date, so a plan starting on
+    the 31st falls on the last day of shorter months and returns to the
+    31st after them.
+    """
+    start = pd.Timestamp(definition['start'])
+    last = pd.Timestamp(today)
+    if definition.get('end'):
+        last = min(last, pd.Timestamp(definition['end']))
+    first = start if after is None else max(start, pd.Timestamp(after) + pd.Timedelta(days=1))
+    if first > last:
+        return []
+
+    interval = int(definition.get('interval') or 1)
+    offset = FREQUENCIES[definition['every']]
+    # Skip straight to the period before ``first`` rather than stepping from the start
+    if definition['every'] == 'month':
+        k = max(0, ((first.year - start.year) * 12 + first.month - start.month) // interval - 1)
+    else:
+        period = 7 if definition['every'] == 'week' else 1
+        k = max(0, (first - start).days // (period * interval))
+
+    dates = []
+    while (date := start + offset(k * interval)) <= last:
+        if date >= first:
+            dates.append(date)
+        k += 1
+    return dates
+
+
+class RecurringExpenses:
+    """Recurring expense definitions, persisted as JSON"""
+
+    def __init__(self, definitions=None, path=None):
+        self.path = path
+        self.definitions = list(definitions or [])
+        # Held for a whole run so two sessions never materialize the same dates
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path=RECURRING_FILE):
+        if not os.path.exists(path):
+            return cls(path=path)
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f).get('definitions'), path=path)
+
+    def save(self, path=None):
+        """Write atomically so a concurrent reader never sees a partial file"""
+        path = path or self.path
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'definitions': self.definitions}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def __bool__(self):
+        return bool(self.definitions)
+
+    def add(self, name, restaurant, amount, every, start, interval=1, shares='', currency='', end=None):
+        """Add a definition and return its id; raises ValueError for an invalid expense"""
+        if every not in FREQUENCIES:
+            raise ValueError(f"Unknown frequency: {every}")
+        if int(interval) < 1:
+            raise ValueError("Interval must be at least 1")
+        row = expense_row(start, name, restaurant, amount, shares, currency)
+        definition_id = uuid.uuid4().hex[:8]
+        self.definitions.append({
+            'id': definition_id,
+            'name': row[1],
+            'restaurant': row[2],
+            'amount': row[3],
+            'shares': row[4],
+            'currency': row[5],
+            'every': every,
+            'interval': int(interval),
+            'start': row[0],
+            'end': end if end is None or isinstance(end, str) else end.strftime('%Y-%m-%d'),
+            'through': None,
+        })
+        return definition_id
+
+    def remove(self, definition_id):
+        self.definitions = [d for d in self.definitions if d['id'] != definition_id]
+
+    def due(self, today):
+        """``(definition, row)`` for every occurrence not yet written, oldest first"""
+        due = []
+        for definition in self.definitions:
+            for date in occurrences(definition, definition.get('through'), today):
+                row = expense_row(
+                    date, definition['name'], definition['restaurant'], definition['amount'],
+                    definition.get('shares', ''), definition.get('currency', '')
+                )
+                due.append((definition, row))
+        due.sort(key=lambda item: item[1][0])
+        return due
+
+
+def run_key(due):
+    """Idempotency key of a run, the same for every retry over the same occurrences"""
+    digest = hashlib.blake2b(digest_size=16)
+    for definition, row in due:
+        digest.update(f"{definition['id']}:{row[0]}\n".encode('utf-8'))
+    return f'recurring-{digest.hexdigest()}'
+
+
+def materialize(service, recurring, index, today, spreadsheet_id=sheets.SPREADSHEET_ID):
+    """Append every due occurrence in one request and advance ``through``.
+
+    Returns the rows appended. Occurrences already in the sheet are
+    skipped; ``through`` is only saved once the append has succeeded.
+    """
+    today = pd.Timestamp(today).strftime('%Y-%m-%d')
+    with recurring.lock:
+        due = recurring.due(today)
+        if not due:
+            return []
+        rows = [row for _, row in due if not index.contains(row)]
+        if rows:
+            dedupe.append_once(service, rows, run_key(due), index, spreadsheet_id)
+        for definition, _ in due:
+            definition['through'] = today
+        recurring.save()
+        return rows
@@ -0,0 +1,82 @@
+"""Settle up a group: net positions and the transfers that clear them.
+
+Amounts are handled in integer cents. Each participant's share of the
+total is an equal split rounded with the largest-remainder method, so the
+net positions always sum to exactly zero.
+
+Finding the smallest possible set of transfers is NP-hard in general.
+``settle`` first pairs debtors and creditors whose positions cancel
+exactly, then walks the remaining debtors and creditors from the largest
+down, matching them pairwise. Every transfer clears at least one person,
+so a group of N needs at most N - 1 transfers.
+"""
+import numpy as np
+import pandas as pd
+
+
+def to_cents(amounts):
+    return np.rint(np.asarray(amounts, dtype=float) * 100).astype(np.int64)
+
+
+def split_cents(total, weights):
+    """Split ``total`` cents in proportion to ``weights``, summing exactly to ``total``"""
+    weights = np.asarray(weights, dtype=float)
+    if weights.sum() <= 0:
+        raise ValueError("At least one weight must be positive")
+    exact = total * weights / weights.sum()
+    shares = np.floor(exact).astype(np.int64)
+    remainder = int(total - shares.sum())
+    if remainder:
+        # Hand the leftover cents to the largest fractional parts (ties by position)
+        order = np.argsort(-(exact - shares), kind='stable')
+        shares[order[:remainder]] += 1
+    return shares
+
+
+def net_positions(paid, weights=None):
+    """Cents each person paid beyond their share (negative: owes the group).
+
+    ``paid`` is a Series of amounts indexed by participant; ``weights``
+    defaults to an equal split.
+    """
+    paid_cents = to_cents(paid.to_numpy())
+    if weights is None:
+        weights = np.ones(len(paid_cents))
+    shares = split_cents(int(paid_cents.sum()), weights)
+    return pd.Series(paid_cents - shares, index=paid.index)
+
+
+def settle(net):
+    """``(debtor, creditor, amount)`` transfers that bring every position to zero"""
+    net = {person: int(cents) for person, cents in net.items() if cents}
+    transfers = []
+
+    # Exact opposites settle in a single transfer each
+    creditors_by_amount = {}
+    for person, cents in net.items():
+        if cents > 0:
+            creditors_by_amount.setdefault(cents, []).append(person)
+    for person, cents in sorted(net.items(), key=lambda item: item[1]):
+        if cents < 0 and creditors_by_amount.get(-cents):
+            creditor = creditors_by_amount[-cents].pop()
+            transfers.append((person, creditor, -cents))
+            net[person] = net[creditor] = 0
+
+    names = np.array([person for person, cents in net.items() if cents], dtype=object)
+    balances = np.array([net[person] for person in names], dtype=np.int64)
+    debtors = sorted(np.flatnonzero(balances < 0), key=lambda i: balances[i])
+    creditors = sorted(np.flatnonzero(balances > 0), key=lambda i: -balances[i])
+
+    d = c = 0
+    while d < len(debtors) and c < len(creditors):
+        debtor, creditor = debtors[d], creditors[c]
+        amount = min(-balances[debtor], balances[creditor])
+        transfers.append((names[debtor], names[creditor], int(amount)))
+        balances[debtor] += amount
+        balances[creditor] -= amount
+        if balances[debtor] == 0:
+            d += 1
+        if balances[creditor] == 0:
+            c += 1
+
+    return [(debtor, creditor, cents / 100) for debtor, creditor, cents in transfers]
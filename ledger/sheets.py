@@ -0,0 +1,224 @@
+"""Google Sheets storage for the ledger.
+
+These helpers raise ``SheetsError`` (or the client library's own
+exceptions) instead of reporting to a UI, so they can be used from the
+Streamlit app, batch jobs and benchmarks alike. The Google client
+libraries are imported only when a connection is made.
+"""
+from ledger import metrics
+from ledger.model import pad_rows
+
+SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+SPREADSHEET_ID = '1QrUs7dCZefWxPbhNcn_h99VN2DE3AQaBlZz0G9haxXE'
+RANGE_NAME = 'Sheet1!A:F'
+SHEET_NAME = 'Sheet1'
+
+# Keep each append well under the API's request size limit and the
+# recommended ~2 MB payload so a batch never has to be retried as a whole
+MAX_APPEND_ROWS = 5000
+MAX_APPEND_BYTES = 2_000_000
+
+
+class SheetsError(Exception):
+    """A Sheets operation did not have the expected effect"""
+
+
+def connect(service_account_info):
+    """Build a Sheets v4 client from a service-account info dict"""
+    from google.oauth2 import service_account
+    from googleapiclient import discovery
+
+    creds = service_account.Credentials.from_service_account_info(
+        service_account_info, scopes=SCOPES)
+    return discovery.build('sheets', 'v4', credentials=creds)
+
+
+def connect_local(endpoint):
+    """Build a Sheets v4 client for a local stand-in, without credentials"""
+    import httplib2
+    from googleapiclient import discovery
+
+    return discovery.build(
+        'sheets', 'v4',
+        http=httplib2.Http(),
+        client_options={'api_endpoint': endpoint},
+        static_discovery=True
+    )
+
+
+def update_sheet(service, values, spreadsheet_id=SPREADSHEET_ID):
+    """Append one row of values after the last row of the ledger"""
+    body = {
+        'values': [values]
+    }
+    return metrics.execute('values.append', service.spreadsheets().values().append(
+        spreadsheetId=spreadsheet_id,
+        range=RANGE_NAME,
+        valueInputOption='USER_ENTERED',
+        body=body
+    ))
+
+
+def batch_rows(rows, max_rows=MAX_APPEND_ROWS, max_bytes=MAX_APPEND_BYTES):
+    """Split rows into lists that fit in one append request"""
+    batch = []
+    batch_bytes = 0
+    for row in rows:
+        # JSON-encoded size estimate: quotes and separators per cell
+        row_bytes = sum(len(str(value).encode('utf-8')) + 4 for value in row) + 2
+        if batch and (len(batch) >= max_rows or batch_bytes + row_bytes > max_bytes):
+            yield batch
+            batch = []
+            batch_bytes = 0
+        batch.append(row)
+        batch_bytes += row_bytes
+    if batch:
+        yield batch
+
+
+def append_rows(service, rows, spreadsheet_id=SPREADSHEET_ID, progress=None):
+    """Append many rows with as few values.append calls as the size limits allow.
+
+    ``progress(done, total)`` is called after every batch.
+    """
+    rows = list(rows)
+    done = 0
+    results = []
+    for batch in batch_rows(rows):
+        results.append(metrics.execute('values.append', service.spreadsheets().values().append(
+            spreadsheetId=spreadsheet_id,
+            range=RANGE_NAME,
+            valueInputOption='USER_ENTERED',
+            insertDataOption='INSERT_ROWS',
+            body={'values': batch}
+        )))
+        done += len(batch)
+        if progress is not None:
+            progress(done, len(rows))
+    return results
+
+
+def fetch_sheet_data(service, spreadsheet_id=SPREADSHEET_ID):
+    """Return every ledger row, header included, as lists of strings padded to the ledger width"""
+    result = metrics.execute('values.get', service.spreadsheets().values().get(
+        spreadsheetId=spreadsheet_id,
+        range=RANGE_NAME
+    ))
+    return pad_rows(result.get('values', []))
+
+
+def get_sheet_id(service, spreadsheet_id=SPREADSHEET_ID):
+    """Get the sheet ID of the first sheet in the spreadsheet."""
+    spreadsheet = metrics.execute(
+        'spreadsheets.get', service.spreadsheets().get(spreadsheetId=spreadsheet_id))
+    return spreadsheet['sheets'][0]['properties']['sheetId']
+
+
+def delete_row(service, row_index, spreadsheet_id=SPREADSHEET_ID):
+    """Delete a row (1-based, as shown in the sheet) from the Google Sheet."""
+    sheet_id = get_sheet_id(service, spreadsheet_id)
+    request = {
+        "deleteDimension": {
+            "range": {
+                "sheetId": sheet_id,
+                "dimension": "ROWS",
+                "startIndex": row_index - 1,  # Convert to 0-based index
+                "endIndex": row_index
+            }
+        }
+    }
+
+    metrics.execute('spreadsheets.batchUpdate', service.spreadsheets().batchUpdate(
+        spreadsheetId=spreadsheet_id,
+        body={"requests": [request]}
+    ))
+
+
+def batch_update(service, requests, spreadsheet_id=SPREADSHEET_ID):
+    """Apply a list of spreadsheets.batchUpdate requests in one call, atomically."""
+    return metrics.execute('spreadsheets.batchUpdate', service.spreadsheets().batchUpdate(
+        spreadsheetId=spreadsheet_id,
+        body={"requests": requests}
+    ))
+
+
+def row_runs(row_indices):
+    """Group 1-based row numbers into ``(first, count)`` runs of consecutive rows, in order"""
+    runs = []
+    for row_index in sorted(row_indices):
+        if runs and runs[-1][0] + runs[-1][1] == row_index:
+            runs[-1][1] += 1
+        else:
+            runs.append([row_index, 1])
+    return [tuple(run) for run in runs]
+
+
+def delete_rows_requests(sheet_id, row_indices):
+    """deleteDimension requests for the given 1-based rows, bottom run first so indices stay valid"""
+    return [
+        {"deleteDimension": {"range": {
+            "sheetId": sheet_id, "dimension": "ROWS",
+            "startIndex": first - 1, "endIndex": first - 1 + count
+        }}}
+        for first, count in reversed(row_runs(row_indices))
+    ]
+
+
+def cell_data(value):
+    """updateCells value for a cell as read from the sheet; numeric text is written as a number"""
+    try:
+        return {"userEnteredValue": {"numberValue": float(value)}}
+    except (TypeError, ValueError):
+        return {"userEnteredValue": {"stringValue": value}}
+
+
+def update_cells_request(sheet_id, row_index, col_index, rows):
+    """updateCells request writing ``rows`` of values from a 1-based row and 0-based column"""
+    return {"updateCells": {
+        "start": {"sheetId": sheet_id, "rowIndex": row_index - 1, "columnIndex": col_index},
+        "rows": [{"values": [cell_data(value) for value in row]} for row in rows],
+        "fields": "userEnteredValue"
+    }}
+
+
+def insert_rows_requests(sheet_id, row_indices, rows):
+    """insertDimension and updateCells requests that put ``rows`` back at the given 1-based rows.
+
+    ``row_indices`` are the rows' positions before they were removed, so
+    runs are restored top first.
+    """
+    by_row = dict(zip(row_indices, rows))
+    requests = []
+    for first, count in row_runs(row_indices):
+        requests.append({"insertDimension": {
+            "range": {"sheetId": sheet_id, "dimension": "ROWS", "startIndex": first - 1, "endIndex": first - 1 + count},
+            "inheritFromBefore": first > 1
+        }})
+        requests.append(update_cells_request(sheet_id, first, 0, [by_row[row] for row in range(first, first + count)]))
+    return requests
+
+
+def update_cell(service, row_index, col_index, value, spreadsheet_id=SPREADSHEET_ID):
+    """Update a specific cell in the Google Sheet and verify the stored value."""
+    # Get the A1 notation range for the cell
+    col_letter = chr(65 + col_index)  # A=0, B=1, etc.
+    cell_range = f'{SHEET_NAME}!{col_letter}{row_index}'
+
+    metrics.execute('values.update', service.spreadsheets().values().update(
+        spreadsheetId=spreadsheet_id,
+        range=cell_range,
+        valueInputOption='USER_ENTERED',
+        body={'values': [[value]]}
+    ))
+
+    # Verify the update
+    verify = metrics.execute('values.get', service.spreadsheets().values().get(
+        spreadsheetId=spreadsheet_id,
+        range=cell_range
+    ))
+
+    # An emptied cell comes back without any values
+    stored = verify.get('values', [[]])
+    stored = stored[0][0] if stored and stored[0] else ''
+    if stored != value:
+        raise SheetsError("Cell update verification failed")
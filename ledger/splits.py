@@ -0,0 +1,198 @@
+"""Split ratios: who is expected to carry what share of each expense.
+
+By default every participant carries an equal share. A schedule of
+weights with effective dates changes that from a given day on (for
+example 60/40 after a change of income), and an override can set the
+weights of a single expense. Rules are stored as JSON::
+
+    {
+      "schedule": [
+        {"effective": "2025-01-01", "weights": {"Katy": 60, "Sebastien": 40}}
+      ],
+      "overrides": [
+        {"date": "2025-03-14", "name": "Katy", "restaurant": "Miss Pho",
+         "amount": "42.50", "weights": {"Katy": 1}}
+      ]
+    }
+
+Participants missing from a weights mapping carry nothing under it. An
+expense's own Shares cell in the sheet takes precedence over both.
+
+Every expense is matched to the schedule entry in force on its date with
+one ``pd.merge_asof`` and to overrides with one hash join. Shares cells
+are parsed once per distinct value (a group has few sharing patterns) and
+broadcast back as rows of the weight matrix, so evaluating the whole
+history stays vectorized. Each person's total is one ``amounts @ weights``
+product, rounded to cents once at the end; ``settlement`` then turns the
+totals into exact cents that sum to what was paid.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from ledger.model import parse_shares
+
+SPLITS_FILE = 'split_ratios.json'
+OVERRIDE_KEYS = ['date', 'name', 'restaurant', 'cents']
+
+
+class SplitRules:
+    """Weight schedule and per-expense overrides, persisted as JSON"""
+
+    def __init__(self, schedule=None, overrides=None, path=None):
+        self.path = path
+        self.schedule = sorted(schedule or [], key=lambda entry: entry['effective'])
+        self.overrides = list(overrides or [])
+
+    @classmethod
+    def load(cls, path=SPLITS_FILE):
+        if not os.path.exists(path):
+            return cls(path=path)
+        with open(path, encoding='utf-8') as f:
+            rules = json.load(f)
+        return cls(rules.get('schedule'), rules.get('overrides'), path=path)
+
+    def to_dict(self):
+        return {'schedule': self.schedule, 'overrides': self.overrides}
+
+    def save(self, path=None):
+        """Write atomically so a concurrent reader never sees a partial file"""
+        path = path or self.path
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @property
+    def version(self):
+        """Fingerprint of the rules, for cache keys"""
+        encoded = json.dumps(self.to_dict(), sort_keys=True).encode('utf-8')
+        return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+    def __bool__(self):
+        return bool(self.schedule or self.overrides)
+
+    def set_schedule(self, frame):
+        """Replace the schedule from a frame with an Effective column and one weight column per person"""
+        self.schedule = []
+        for record in frame.dropna(subset=['Effective']).sort_values('Effective').to_dict('records'):
+            effective = pd.Timestamp(record.pop('Effective')).strftime('%Y-%m-%d')
+            weights = {name: float(weight) for name, weight in record.items() if pd.notna(weight) and weight > 0}
+            if weights:
+                self.schedule.append({'effective': effective, 'weights': weights})
+
+    def schedule_frame(self, participants):
+        """Effective date and one weight column per participant, oldest first"""
+        frame = pd.DataFrame(
+            [entry['weights'] for entry in self.schedule], columns=participants, dtype=float
+        ).fillna(0.0)
+        frame.insert(0, 'Effective', pd.to_datetime([entry['effective'] for entry in self.schedule]))
+        return frame
+
+    def add_override(self, row, weights):
+        """Record custom weights for the expense written as sheet ``row``"""
+        date, name, restaurant, amount = row[:4]
+        self.overrides.append({
+            'date': date, 'name': name, 'restaurant': restaurant, 'amount': str(amount),
+            'weights': {person: float(weight) for person, weight in weights.items() if weight > 0},
+        })
+
+    def overrides_frame(self, participants):
+        records = [
+            {
+                'date': override['date'],
+                'name': override['name'],
+                'restaurant': override['restaurant'].strip().casefold(),
+                'cents': int(round(float(override['amount']) * 100)),
+                **override['weights'],
+            }
+            for override in self.overrides
+        ]
+        frame = pd.DataFrame(records, columns=OVERRIDE_KEYS + participants)
+        frame[participants] = frame[participants].astype(float).fillna(0.0)
+        return frame.drop_duplicates(OVERRIDE_KEYS, keep='last')
+
+
+def shares_matrix(shares, participants):
+    """Weights from a Shares column, one row per expense; NaN rows where the cell is empty"""
+    codes, patterns = pd.factorize(shares.fillna('').astype(str).str.strip())
+    column = {name: i for i, name in enumerate(participants)}
+    pattern_weights = np.full((len(patterns), len(participants)), np.nan)
+    for row, text in enumerate(patterns):
+        parsed = parse_shares(text)
+        if parsed:
+            pattern_weights[row] = 0.0
+            for name, weight in parsed.items():
+                if name in column:
+                    pattern_weights[row, column[name]] = weight
+    return pattern_weights[codes]
+
+
+def weight_matrix(expenses, rules, participants):
+    """Row-normalized weights, one row per expense and one column per participant.
+
+    ``expenses`` needs Date, Name, Restaurant and Amount columns and may
+    have a Shares column; its index is kept.
+    """
+    n = len(participants)
+    weights = np.ones((len(expenses), n))
+    shared = has_shares(expenses)
+    if (not rules and not shared) or expenses.empty:
+        return pd.DataFrame(weights / max(n, 1), index=expenses.index, columns=participants)
+
+    position = pd.Series(np.arange(len(expenses)), index=expenses.index, name='_position')
+    left = pd.DataFrame({'Date': pd.to_datetime(expenses['Date']), '_position': position})
+
+    if rules and rules.schedule:
+        in_force = pd.merge_asof(
+            left.sort_values('Date'), rules.schedule_frame(participants),
+            left_on='Date', right_on='Effective', direction='backward'
+        )
+        scheduled = in_force['Effective'].notna().to_numpy()
+        rows = in_force['_position'].to_numpy()[scheduled]
+        weights[rows] = in_force.loc[scheduled, participants].to_numpy()
+
+    if rules and rules.overrides:
+        overrides = rules.overrides_frame(participants)
+        # Only expenses on an overridden date need a full key
+        candidates = left['Date'].isin(pd.to_datetime(overrides['date'])).to_numpy()
+        subset = expenses[candidates]
+        keys = pd.DataFrame({
+            'date': left.loc[candidates, 'Date'].dt.strftime('%Y-%m-%d'),
+            'name': subset['Name'].astype(str),
+            'restaurant': subset['Restaurant'].astype(str).str.strip().str.casefold(),
+            'cents': np.rint(pd.to_numeric(subset['Amount'], errors='coerce').fillna(0) * 100).astype(np.int64),
+            '_position': position[candidates],
+        })
+        matched = keys.merge(overrides, on=OVERRIDE_KEYS, how='inner')
+        weights[matched['_position'].to_numpy()] = matched[participants].to_numpy()
+
+    if shared:
+        shared_weights = shares_matrix(expenses['Shares'], participants)
+        rows = ~np.isnan(shared_weights).all(axis=1)
+        weights[rows] = shared_weights[rows]
+
+    totals = weights.sum(axis=1, keepdims=True)
+    # An entry that gives nobody a share falls back to an equal split
+    weights = np.where(totals > 0, weights / np.where(totals > 0, totals, 1), 1.0 / n)
+    return pd.DataFrame(weights, index=expenses.index, columns=participants)
+
+
+def has_shares(expenses):
+    """Whether any expense in the frame has its own Shares cell"""
+    return 'Shares' in expenses.columns and expenses['Shares'].fillna('').astype(bool).any()
+
+
+def owed_totals(expenses, rules, participants):
+    """Amount each participant is expected to carry over their ``expenses``, rounded to cents.
+
+    Expenses paid by someone outside ``participants`` are left out, as they
+    are of the summary table's totals.
+    """
+    expenses = expenses[expenses['Name'].isin(participants)]
+    amounts = pd.to_numeric(expenses['Amount'], errors='coerce').fillna(0).to_numpy()
+    matrix = weight_matrix(expenses, rules, participants).to_numpy()
+    return pd.Series(np.round(amounts @ matrix, 2), index=participants)
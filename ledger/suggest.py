@@ -0,0 +1,102 @@
+"""Ranked restaurant suggestions for the Add Expense form.
+
+``RestaurantIndex`` keeps a sorted array of the casefolded start of every
+word of every restaurant name, so a prefix lookup is a binary search plus
+a scan over the matches. Completions are ranked by how often a restaurant
+was visited, discounted by how long ago the last visit was. Like
+``ledger.dedupe.ExpenseIndex`` it is rebuilt when the data version changes
+and updated in place on append.
+"""
+import bisect
+import heapq
+import threading
+from collections import Counter
+from datetime import date
+
+# A restaurant last visited this many days ago ranks at half its visit count
+RECENCY_HALF_LIFE_DAYS = 60
+
+
+def _word_starts(name):
+    """Casefolded suffixes of ``name`` beginning at each word"""
+    folded = name.casefold()
+    starts = [0] + [i + 1 for i, char in enumerate(folded) if char == ' ']
+    return {folded[start:] for start in starts if start < len(folded)}
+
+
+class RestaurantIndex:
+    """Prefix index over restaurant names with frequency and recency scores"""
+
+    def __init__(self, rows=(), version=None):
+        self._lock = threading.Lock()
+        self.version = None
+        self.sync(version, rows)
+
+    def sync(self, version, rows):
+        """Rebuild from the sheet rows (header excluded) when the data version changed"""
+        with self._lock:
+            if version is not None and version == self.version:
+                return False
+            self._reset()
+            for row in rows:
+                self._add(row)
+            self.version = version
+            return True
+
+    def _reset(self):
+        self._keys = []           # sorted (suffix, canonical key)
+        self._display = {}        # canonical key -> name as first written
+        self._counts = Counter()  # canonical key -> visits
+        self._last = {}           # canonical key -> latest 'YYYY-MM-DD'
+
+    def _add(self, row):
+        try:
+            visited, restaurant = row[0], row[2].strip()
+        except (IndexError, AttributeError):
+            return
+        if not restaurant:
+            return
+        key = restaurant.casefold()
+        if key not in self._display:
+            self._display[key] = restaurant
+            for suffix in _word_starts(restaurant):
+                bisect.insort(self._keys, (suffix, key))
+        self._counts[key] += 1
+        if visited > self._last.get(key, ''):
+            self._last[key] = visited
+
+    def add(self, rows):
+        with self._lock:
+            for row in rows:
+                self._add(row)
+
+    def score(self, key, today=None):
+        today = today or date.today()
+        try:
+            age = (today - date.fromisoformat(self._last[key][:10])).days
+        except (KeyError, ValueError):
+            age = RECENCY_HALF_LIFE_DAYS * 4
+        return self._counts[key] * 0.5 ** (max(age, 0) / RECENCY_HALF_LIFE_DAYS)
+
+    def complete(self, prefix='', limit=10, today=None):
+        """Restaurant names with a word starting with ``prefix``, best ranked first"""
+        prefix = prefix.strip().casefold()
+        if not prefix:
+            matches = set(self._display)
+        else:
+            matches = set()
+            position = bisect.bisect_left(self._keys, (prefix,))
+            while position < len(self._keys) and self._keys[position][0].startswith(prefix):
+                matches.add(self._keys[position][1])
+                position += 1
+
+        today = today or date.today()
+        ranked = heapq.nsmallest(
+            limit if limit is not None else len(matches),
+            matches,
+            key=lambda key: (-self.score(key, today), key)
+        )
+        return [self._display[key] for key in ranked]
+
+    def __len__(self):
+        return len(self._display)
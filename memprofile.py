@@ -0,0 +1,132 @@
+"""Opt-in tracemalloc profiling of the app's pipeline stages.
+
+When enabled, the profiler follows the timing spans from ``tracing`` and
+records for every stage the net allocation delta, the peak above the
+stage's starting point and, for the stages listed in ``detail_stages``,
+the source lines that allocated the most. ``record_frame()`` additionally
+notes the deep size of the objects a stage produced (raw sheet values,
+DataFrames, chart inputs) so the largest holders can be identified.
+
+tracemalloc is process-wide: with several sessions running at once the
+numbers of concurrent stages include each other's allocations.
+"""
+import sys
+import threading
+import time
+import tracemalloc
+
+from tracing import SPAN_HOOKS
+
+
+def deep_size(obj):
+    """Approximate retained size in bytes of a DataFrame, dict of frames or nested list"""
+    memory_usage = getattr(obj, 'memory_usage', None)
+    if memory_usage is not None:
+        usage = memory_usage(deep=True)
+        return int(usage.sum()) if hasattr(usage, 'sum') else int(usage)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(deep_size(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sys.getsizeof(obj) + sum(deep_size(item) for item in obj)
+    return sys.getsizeof(obj)
+
+
+class MemoryProfiler:
+    """Collects per-stage allocation statistics through span hooks"""
+
+    def __init__(self, detail_stages=(), top_n=10, frames=8):
+        self.detail_stages = set(detail_stages)
+        self.top_n = top_n
+        self.frames = frames
+        self.enabled = False
+        self.stages = {}
+        self.objects = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def enable(self):
+        if self.enabled:
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        SPAN_HOOKS.append(self._on_span)
+        self.enabled = True
+
+    def disable(self):
+        if not self.enabled:
+            return
+        SPAN_HOOKS.remove(self._on_span)
+        tracemalloc.stop()
+        self.enabled = False
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _on_span(self, event, name):
+        stack = self._stack()
+        if event == 'enter':
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                # Keep the enclosing stage's peak before it is reset below
+                stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+            snapshot = tracemalloc.take_snapshot() if name in self.detail_stages else None
+            stack.append({'name': name, 'start': current, 'peak': current, 'snapshot': snapshot})
+            tracemalloc.reset_peak()
+            return
+
+        if not stack or stack[-1]['name'] != name:
+            return
+        frame = stack.pop()
+        current, peak = tracemalloc.get_traced_memory()
+        peak = max(peak, frame['peak'])
+        if stack:
+            stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+
+        top_sites = []
+        if frame['snapshot'] is not None:
+            stats = tracemalloc.take_snapshot().compare_to(frame['snapshot'], 'lineno')
+            top_sites = [
+                {
+                    'site': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                    'size_diff': stat.size_diff,
+                    'count_diff': stat.count_diff,
+                }
+                for stat in stats[:self.top_n]
+            ]
+
+        with self._lock:
+            self.stages[name] = {
+                'stage': name,
+                'delta_bytes': current - frame['start'],
+                'peak_bytes': peak - frame['start'],
+                'top_sites': top_sites,
+                'recorded_at': time.time(),
+            }
+
+    def record_frame(self, name, obj):
+        """Note the deep size of an object produced by a stage"""
+        if not self.enabled:
+            return
+        size = deep_size(obj)
+        with self._lock:
+            self.objects[name] = size
+
+    def report(self):
+        """Snapshot of stage statistics and object sizes, largest peak first"""
+        with self._lock:
+            stages = sorted(self.stages.values(), key=lambda stage: stage['peak_bytes'], reverse=True)
+            objects = dict(sorted(self.objects.items(), key=lambda item: item[1], reverse=True))
+        current, peak = tracemalloc.get_traced_memory() if self.enabled else (0, 0)
+        return {'traced_bytes': current, 'stages': stages, 'objects': objects}
+
+
+PROFILER = MemoryProfiler(detail_stages={
+    'fetch_sheet_data',
+    'create_summary_table',
+    'prepare_chart_data',
+    'filter_transactions',
+    'summary_table',
+})
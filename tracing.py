@@ -0,0 +1,99 @@
+"""Lightweight hierarchical timing spans for one script run.
+
+A trace is started at the top of every rerun and spans are opened around
+each stage with ``with span('stage'):``. Spans nest, so the finished trace
+is a flat list of (name, depth, start, duration) records that can be drawn
+as a waterfall or appended to a JSON-lines file for offline analysis.
+
+Streamlit executes each session's script run in its own thread, so the
+active trace is kept in a thread-local.
+"""
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+_local = threading.local()
+_file_lock = threading.Lock()
+
+# Callables invoked as hook(event, name) with event 'enter' or 'exit'.
+# Used by optional profilers that want to follow the same stage boundaries.
+SPAN_HOOKS = []
+
+
+class Trace:
+    """Spans recorded during a single rerun"""
+
+    def __init__(self, label):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.started_at = datetime.now(timezone.utc).isoformat(timespec='milliseconds')
+        self.start = time.perf_counter()
+        self.duration_ms = None
+        self.spans = []
+        self.status = 'ok'
+        self._depth = 0
+
+    def to_dict(self):
+        return {
+            'trace_id': self.id,
+            'label': self.label,
+            'started_at': self.started_at,
+            'duration_ms': self.duration_ms,
+            'status': self.status,
+            'spans': self.spans,
+        }
+
+
+def current_trace():
+    return getattr(_local, 'trace', None)
+
+
+def start_trace(label='rerun'):
+    """Begin a new trace for the current thread and return it"""
+    trace = Trace(label)
+    _local.trace = trace
+    return trace
+
+
+def finish_trace(status='ok'):
+    """Close the current thread's trace and return it (or None)"""
+    trace = current_trace()
+    if trace is None:
+        return None
+    trace.duration_ms = (time.perf_counter() - trace.start) * 1000
+    trace.status = status
+    _local.trace = None
+    return trace
+
+
+@contextmanager
+def span(name):
+    """Time the enclosed block as a child of the currently open span"""
+    trace = current_trace()
+    if trace is None:
+        yield
+        return
+
+    for hook in SPAN_HOOKS:
+        hook('enter', name)
+    record = {'name': name, 'depth': trace._depth, 'start_ms': (time.perf_counter() - trace.start) * 1000}
+    trace.spans.append(record)
+    trace._depth += 1
+    try:
+        yield
+    finally:
+        trace._depth -= 1
+        record['duration_ms'] = (time.perf_counter() - trace.start) * 1000 - record['start_ms']
+        for hook in SPAN_HOOKS:
+            hook('exit', name)
+
+
+def append_jsonl(trace, path):
+    """Append a finished trace as one JSON line"""
+    line = json.dumps(trace.to_dict())
+    with _file_lock:
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')